@@ -0,0 +1,270 @@
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import subprocess
+import contextlib
+import urllib.request
+
+# ============================================================
+# OFFLINE BENCHMARK
+# ============================================================
+# Starts mock_server.py and measures the download pipeline and the
+# cleanup pass against it, after checking the browser-free scraper on
+# its search pages:
+#   python benchmark.py --links 5933 --concurrency 1,4,8
+# Any option not listed below is passed on to the mock server
+# (--latency, --rate-429, --retry-after, --premium-every, --truncate, ...).
+DEFAULT_LINKS_FILE = "links_fluent.txt"
+FIRST_ID = 1000000
+
+
+def cpu_seconds():
+    """CPU time of this process and its finished children (process pools)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def default_link_count():
+    try:
+        with open(DEFAULT_LINKS_FILE, "r") as f:
+            return sum(1 for line in f if line.strip())
+    except OSError:
+        return 1000
+
+
+def make_links(count, first_id=FIRST_ID):
+    """Synthetic links in the format the real links files use."""
+    return [f"https://www.iconfinder.com/icons/{i}/mock_{i}_icon" for i in range(first_id, first_id + count)]
+
+
+def start_server(port, server_args):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_server.py"),
+         "--port", str(port), "--first-id", str(FIRST_ID), *server_args],
+        stdout=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            server_stats(base)
+            return proc, base
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("mock server did not start")
+
+
+def server_stats(base):
+    with urllib.request.urlopen(f"{base}/__stats", timeout=2) as resp:
+        return json.load(resp)
+
+
+@contextlib.contextmanager
+def quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Result:
+    def __init__(self, name, icons, wall, cpu, requests=None):
+        self.name = name
+        self.icons = icons
+        self.wall = wall
+        self.cpu = cpu
+        self.requests = requests
+
+    def row(self):
+        per_icon = f"{self.requests / self.icons:.2f}" if self.requests is not None and self.icons else "-"
+        rate = self.icons / self.wall if self.wall else 0.0
+        return f"{self.name:<32} {self.icons:>7} {self.wall:>9.1f}s {rate:>9.1f} {per_icon:>9} {self.cpu:>8.1f}s"
+
+
+def measure(name, icons, base, run):
+    before = server_stats(base)["requests"] if base else 0
+    wall, cpu = time.monotonic(), cpu_seconds()
+    run()
+    wall, cpu = time.monotonic() - wall, cpu_seconds() - cpu
+    requests = server_stats(base)["requests"] - before if base else None
+    return Result(name, icons, wall, cpu, requests)
+
+
+def setup_unified(base, concurrency, initial_rate, max_rate):
+    from iconfinder_downloader import download as unified
+    from iconfinder_downloader.rate_control import RateController
+
+    unified.BASE_URL = base
+    unified.set_concurrency(concurrency)
+    unified.rate_controller = RateController(initial_rate=initial_rate, max_rate=max_rate,
+                                             backoff=0.5)
+    unified.init_session_pool()
+    return unified
+
+
+def bench_download_icon(base, links, work_dir, args):
+    """download_icon on its own, one icon after the other."""
+    unified = setup_unified(base, 1, args.initial_rate, args.max_rate)
+    icon_dir = os.path.join(work_dir, "single")
+    icon_re = unified.compile_icon_regex([])
+
+    def run():
+        # Failed attempts are retried on the spot, with no backoff
+        for link in links:
+            for attempt in range(1, 11):
+                if unified.download_icon(link, icon_dir, icon_re, "", attempt=attempt) != unified.ICON_DEFERRED:
+                    break
+    with quiet(not args.verbose):
+        return measure("download_icon (sequential)", len(links), base, run)
+
+
+def bench_main_loop(base, links, work_dir, concurrency, args):
+    """The full per-family pipeline: plan, download engine, manifest."""
+    unified = setup_unified(base, concurrency, args.initial_rate, args.max_rate)
+    icon_dir = os.path.join(work_dir, f"loop-{concurrency}")
+    links_file = os.path.join(work_dir, "links.txt")
+    with open(links_file, "w") as f:
+        f.write("\n".join(links) + "\n")
+    config = {
+        "family": "bench", "icon_dir": icon_dir, "links_file": links_file,
+        "icon_types": [], "prefix_to_remove": "",
+    }
+
+    def run():
+        family = unified.Family("bench", config)
+        family.open()
+        family.load_links()
+        unified.download_all(unified.with_retries((family, link) for link in family.links), len(family.links))
+        unified.drain_retries()
+        family.close()
+    with quiet(not args.verbose):
+        result = measure(f"main loop (concurrency {concurrency})", len(links), base, run)
+    return result, icon_dir
+
+
+# Hrefs the link extraction must handle, as they appear on result pages
+SEARCH_PAGE_FIXTURE = """
+<a data-action="icon-details" href="/icons/101/arrow_left_icon">relative</a>
+<a href='https://www.iconfinder.com/icons/102/arrow_right_bold_icon?ref=search'>absolute, query</a>
+<a href="/icons/101/arrow_left_icon#top">duplicate, fragment</a>
+<a href="/icons/103/download/svg/4096">download link</a>
+<a href="/iconsets/104/arrows_icon">icon set</a>
+<a href="/search?q=arrow&page=2">next page</a>
+"""
+SEARCH_PAGE_FIXTURE_LINKS = {
+    "https://www.iconfinder.com/icons/101/arrow_left_icon",
+    "https://www.iconfinder.com/icons/102/arrow_right_bold_icon",
+}
+
+
+def check_http_scraper(base, args):
+    """The browser-free scraper against a fixture and the mock search pages.
+
+    Every mock link must be found exactly once, and the scraper must stop
+    with the batch that reaches the first empty page. Returns a Result
+    and the list of failed checks.
+    """
+    from iconfinder_downloader.http_scraper import parse_icon_links, iter_icon_links_http
+    from iconfinder_downloader.session_pool import make_session
+
+    failures = []
+    found = parse_icon_links(SEARCH_PAGE_FIXTURE)
+    if found != SEARCH_PAGE_FIXTURE_LINKS:
+        failures.append(f"fixture: expected {sorted(SEARCH_PAGE_FIXTURE_LINKS)}, got {sorted(found)}")
+
+    stats = server_stats(base)
+    layout, before = stats["search"], stats["search_requests"]
+    workers = 4
+    links = []
+    with quiet(not args.verbose):
+        result = measure("http scraper (search pages)", layout["pages"], base,
+                         lambda: links.extend(iter_icon_links_http(make_session(), f"{base}/search?q=mock",
+                                                                   workers=workers)))
+    expected = {f"https://www.iconfinder.com/icons/{i}/mock_{i}_icon"
+                for i in range(layout["first_id"], layout["first_id"] + layout["pages"] * layout["per_page"])}
+    if len(links) != len(set(links)):
+        failures.append(f"scraper: {len(links) - len(set(links))} duplicate links")
+    if set(links) != expected:
+        failures.append(f"scraper: {len(expected - set(links))} links missing, {len(set(links) - expected)} unexpected")
+    # Pages are requested `workers` at a time, up to the batch holding the first empty page
+    expected_requests = (layout["pages"] // workers + 1) * workers
+    requested = server_stats(base)["search_requests"] - before
+    if requested != expected_requests:
+        failures.append(f"scraper: requested {requested} pages, expected to stop after {expected_requests}")
+    return result, failures
+
+
+def bench_cleanup(icon_dir, icons, args):
+    from iconfinder_downloader import verify as cleanup
+    results = []
+    for label, kwargs in (("cleanup quick, cold", {"use_cache": False}),
+                          ("cleanup deep, cold", {"use_cache": False, "deep": True})):
+        with quiet(not args.verbose):
+            results.append(measure(label, icons, None,
+                                   lambda: cleanup.delete_faulty_images(icon_dir, **kwargs)))
+    # The cold passes don't write the cache, so one untimed pass fills it
+    with quiet(not args.verbose):
+        cleanup.delete_faulty_images(icon_dir)
+        results.append(measure("cleanup quick, cached", icons, None,
+                               lambda: cleanup.delete_faulty_images(icon_dir)))
+    return results
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the downloader against a local mock server.")
+    parser.add_argument("--links", type=int, default=None,
+                        help=f"number of synthetic links (default: size of {DEFAULT_LINKS_FILE})")
+    parser.add_argument("--concurrency", default="1,4,8", help="comma-separated levels to compare")
+    parser.add_argument("--single", type=int, default=50,
+                        help="icons for the sequential download_icon run")
+    parser.add_argument("--initial-rate", type=float, default=50.0)
+    parser.add_argument("--max-rate", type=float, default=500.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-cleanup", action="store_true", help="skip the cleanup benchmark")
+    parser.add_argument("--no-scraper", action="store_true", help="skip the http scraper check")
+    parser.add_argument("--verbose", action="store_true", help="show the downloader output")
+    return parser.parse_known_args(argv)
+
+
+def main(argv):
+    args, server_args = parse_args(argv)
+    links = make_links(args.links or default_link_count())
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    proc, base = start_server(args.port, server_args)
+    results = []
+    failures = []
+    try:
+        if not args.no_scraper:
+            result, failures = check_http_scraper(base, args)
+            results.append(result)
+        with tempfile.TemporaryDirectory(prefix="iconfinder-bench-") as work_dir:
+            results.append(bench_download_icon(base, links[:args.single], work_dir, args))
+            icon_dir = None
+            for level in levels:
+                result, icon_dir = bench_main_loop(base, links, work_dir, level, args)
+                results.append(result)
+            if icon_dir and not args.no_cleanup:
+                results.extend(bench_cleanup(icon_dir, len(links) * 2, args))
+            stats = server_stats(base)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"\n{'benchmark':<32} {'items':>7} {'wall':>10} {'items/s':>9} {'req/item':>9} {'cpu':>9}")
+    for result in results:
+        print(result.row())
+    print(f"\nMock server: {stats['requests']} requests, by status {stats['by_status']}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,3 @@
+"""Download Iconfinder icon families as SVG and PNG."""
+
+__version__ = "0.1.0"
@@ -0,0 +1,66 @@
+import os
+import shutil
+import threading
+
+# ============================================================
+# CONTENT-ADDRESSED STORAGE
+# ============================================================
+# Every downloaded body is kept once under <icon_dir>/.blobs, named by
+# its SHA-256, and the usual <base_name>/<icon_type>.<ext> files are
+# hardlinks to it. Identical icons (aliases, duplicated glyphs) and
+# re-downloads of unchanged files then cost no extra disk space.
+BLOB_DIR_NAME = ".blobs"
+
+
+class BlobStore:
+    def __init__(self, icon_dir):
+        self.root = os.path.join(icon_dir, BLOB_DIR_NAME)
+        self.stored = 0        # new unique blobs
+        self.deduped = 0       # bodies that matched an existing blob
+        self.bytes_saved = 0
+        self.copies = 0        # hardlink unsupported, fell back to a copy
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], f"{digest}{ext}")
+
+    def put(self, tmp_path, digest, ext):
+        """Move a validated temp file into the store, or drop it if the blob exists."""
+        blob = self.blob_path(digest, ext)
+        with self._lock:
+            if os.path.exists(blob):
+                self.deduped += 1
+                self.bytes_saved += os.path.getsize(tmp_path)
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(tmp_path, blob)
+                self.stored += 1
+        return blob
+
+    def materialize(self, blob, path):
+        """Atomically point `path` at `blob`, with a hardlink or else a copy."""
+        tmp_path = f"{path}.{threading.get_ident()}.link"
+        try:
+            os.link(blob, tmp_path)
+        except OSError:
+            shutil.copy2(blob, tmp_path)
+            with self._lock:
+                self.copies += 1
+        os.replace(tmp_path, path)
+
+    def discard_unused(self, digest, ext):
+        """Remove the blob of `digest` if no icon file links to it anymore."""
+        blob = self.blob_path(digest, ext)
+        with self._lock:
+            try:
+                if os.stat(blob).st_nlink == 1:
+                    os.remove(blob)
+                    return True
+            except FileNotFoundError:
+                pass
+        return False
+
+    def summary(self):
+        return (f"{self.stored} unique blobs stored, {self.deduped} duplicates linked "
+                f"({self.bytes_saved / 1024:.0f} KiB saved), {self.copies} copied without hardlinks")
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import bisect
+
+from .manifest import Manifest, MANIFEST_NAME
+from .planner import scan_icon_dir
+
+# ============================================================
+# CATALOG INDEX
+# ============================================================
+# One JSON file per family, <icon_dir>/catalog.json, listing every
+# downloaded icon name with its styles, Iconfinder ids, formats, sizes
+# and hashes. The entries are sorted by name, so a name or a prefix is
+# found by bisection and build tools can resolve references without
+# walking the icon folders. Built from the manifest after every download
+# and by the `catalog` command.
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+
+def catalog_path(icon_dir):
+    return os.path.join(icon_dir, CATALOG_NAME)
+
+
+def derived_sizes(files):
+    """{"<base_name>/<icon_type>": [sizes]} of the extra PNGs (derive_sizes.py) on disk."""
+    found = {}
+    for key in files:
+        stem, at, rest = key.rpartition("@")
+        if at and rest.endswith(".png") and rest[:-len(".png")].isdigit():
+            found.setdefault(stem, []).append(int(rest[:-len(".png")]))
+    return {stem: sorted(sizes) for stem, sizes in found.items()}
+
+
+def build_catalog(family, icon_dir, shared=False):
+    """Write <icon_dir>/catalog.json from the manifest. Returns its path, or
+    None if the family has no manifest yet."""
+    if not os.path.exists(os.path.join(icon_dir, MANIFEST_NAME)):
+        return None
+    manifest = Manifest.for_family(icon_dir, shared=shared)
+    try:
+        rows = manifest.catalog_rows()
+    finally:
+        manifest.close()
+
+    # One pass over the tree for the derived sizes
+    sizes = derived_sizes(scan_icon_dir(icon_dir))
+
+    icons = {}
+    for row in rows:
+        style = {"id": row["icon_id"], "formats": {}}
+        for kind in ("svg", "png"):
+            if row[f"{kind}_size"] is not None:
+                style["formats"][kind] = {"size": row[f"{kind}_size"], "sha256": row[f"{kind}_hash"]}
+        png_sizes = sizes.get(f"{row['base_name']}/{row['icon_type']}")
+        if png_sizes:
+            style["png_sizes"] = png_sizes
+        icons.setdefault(row["base_name"], {})[row["icon_type"]] = style
+
+    catalog = {
+        "version": CATALOG_VERSION,
+        "family": family,
+        "generated_at": time.time(),
+        # [name, {icon_type: {id, formats, png_sizes}}], sorted by name
+        "icons": sorted(icons.items()),
+    }
+    path = catalog_path(icon_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    print(f"📇 Catalog {path}: {len(icons)} names, {len(rows)} icons")
+    return path
+
+
+class Catalog:
+    """A loaded catalog.json with name, prefix and substring lookups."""
+
+    def __init__(self, data):
+        self.family = data["family"]
+        self.entries = data["icons"]
+        self.names = [name for name, _ in self.entries]
+
+    @classmethod
+    def load(cls, icon_dir):
+        with open(catalog_path(icon_dir), "r") as f:
+            return cls(json.load(f))
+
+    def get(self, name):
+        """{icon_type: details} for an exact name, or None."""
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return self.entries[i][1]
+        return None
+
+    def prefix(self, prefix):
+        """(name, styles) of every name starting with `prefix`, in order."""
+        i = bisect.bisect_left(self.names, prefix)
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            yield self.entries[i]
+            i += 1
+
+    def search(self, query):
+        """Prefix matches first, then the names containing `query` elsewhere."""
+        yield from self.prefix(query)
+        for name, styles in self.entries:
+            if query in name and not name.startswith(query):
+                yield name, styles
@@ -0,0 +1,223 @@
+import sys
+import json
+import argparse
+
+# ============================================================
+# COMMAND LINE
+# ============================================================
+# Every subcommand imports its implementation (and through it requests,
+# Selenium or Pillow) only when it runs, so `stats` and `verify` start
+# without loading any of the download dependencies.
+
+# Folder `verify` checks when no root_dir is given
+ICON_ROOT_DIR = "icons"
+# Same as export.EXPORT_DIR / export.ARCHIVE_FORMATS, without importing export
+EXPORT_DIR = "exports"
+ARCHIVE_FORMATS = ("tar", "tar.gz", "zip")
+
+
+def run_scrape(args):
+    from .download import scrape
+    scrape(args)
+
+
+def run_download(args):
+    from .download import download
+    download(args)
+
+
+def run_verify(args):
+    from .verify import delete_faulty_images
+    delete_faulty_images(args.root_dir, deep=args.deep, workers=args.workers, use_cache=not args.no_cache)
+
+
+def run_stats(args):
+    from .config import load_config, family_names
+    from .stats import family_stats, format_stats
+    results = [family_stats(name, load_config(name)) for name, _ in family_names(args.families, args.all)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for stats in results:
+        print(format_stats(stats, show_failed=args.failed))
+
+
+def run_export(args):
+    from .config import load_config
+    from .export import export_family
+    export_family(load_config(args.family), args.format, args.out, sprites=not args.no_sprites)
+
+
+def run_optimize(args):
+    from .config import load_config
+    from .optimize import optimize_family, DEFAULT_SVG_PRECISION
+    config = load_config(args.family)
+    optimize_family(config["icon_dir"], args.precision or config.get("svg_precision", DEFAULT_SVG_PRECISION),
+                    args.workers, dedup=bool(config.get("dedup")))
+
+
+def run_catalog(args):
+    from .config import load_config, family_names
+    from .catalog import build_catalog
+    for name, _ in family_names(args.families, args.all):
+        if build_catalog(name, load_config(name)["icon_dir"]) is None:
+            print(f"⚠️ {name} has no manifest yet, download it first")
+
+
+def run_search(args):
+    from .config import load_config, family_names
+    from .catalog import Catalog
+    names = family_names(args.families, args.all or not args.families)
+    query = args.query.lower()  # icon names are stored lowercase
+    results = []
+    for name, _ in names:
+        icon_dir = load_config(name)["icon_dir"]
+        try:
+            catalog = Catalog.load(icon_dir)
+        except FileNotFoundError:
+            print(f"⚠️ No catalog for {name}, run `catalog {name}` first", file=sys.stderr)
+            continue
+        matches = catalog.prefix(query) if args.prefix else catalog.search(query)
+        for icon_name, styles in matches:
+            results.append((name, icon_dir, icon_name, styles))
+            if args.limit and len(results) >= args.limit:
+                break
+        if args.limit and len(results) >= args.limit:
+            break
+
+    if args.json:
+        print(json.dumps([{"family": family, "name": icon_name, "styles": styles}
+                          for family, _, icon_name, styles in results], indent=2))
+        return
+    for family, icon_dir, icon_name, styles in results:
+        ids = ", ".join(f"{icon_type} #{style['id']}" for icon_type, style in sorted(styles.items()))
+        print(f"{family}/{icon_name}: {ids}  ({icon_dir}/{icon_name}/)")
+    print(f"{len(results)} matches", file=sys.stderr)
+
+
+def run_derive(args):
+    from .config import load_config
+    from .derive_sizes import derive_from_config
+    config = load_config(args.family)
+    if not config.get("png_sizes"):
+        print(f"No png_sizes configured for {args.family}")
+        sys.exit(1)
+    derive_from_config(config, args.workers)
+
+
+def parse_shard(value):
+    """'2/4' -> (2, 4): the second of four shards."""
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, e.g. 2/4, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}")
+    return index, count
+
+
+def add_family_arguments(parser):
+    parser.add_argument("families", nargs="*",
+                        help="configuration names (configuration_<family>.json), optionally "
+                             "<family>:N to stop that family after N links")
+    parser.add_argument("--all", action="store_true",
+                        help="every family with a configuration_*.json file")
+
+
+def add_network_arguments(parser):
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="requests in flight per host (overrides the 'concurrency' config key)")
+    parser.add_argument("--sessions", type=int, default=None,
+                        help="number of HTTP sessions, each with its own proxy if PROXIES is set "
+                             "(overrides the 'sessions' config key)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="iconfinder-downloader",
+                                     description="Download Iconfinder icon families.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrape = commands.add_parser("scrape", help="collect the links files without downloading")
+    add_family_arguments(scrape)
+    add_network_arguments(scrape)
+    scrape.add_argument("--force", action="store_true", help="scrape again even if the links file exists")
+    scrape.set_defaults(func=run_scrape, needs_family=True)
+
+    download = commands.add_parser("download", help="download one or several families")
+    add_family_arguments(download)
+    add_network_arguments(download)
+    download.add_argument("--stream", action="store_true",
+                          help="when links must be scraped, start downloading while the scraper runs")
+    download.add_argument("--refresh", action="store_true",
+                          help="revalidate finished icons with ETag/Last-Modified and rewrite only changed files")
+    download.add_argument("--shard", type=parse_shard, metavar="I/N",
+                          help="only download the icons of shard I of N (split by icon id)")
+    download.add_argument("--leases", action="store_true",
+                          help="claim every icon in <icon_dir>/.leases so workers sharing icon_dir "
+                               "never download the same icon")
+    download.add_argument("--lease-ttl", type=float, default=None, metavar="SECONDS",
+                          help="take over leases not renewed for this long (default 600, implies --leases)")
+    download.add_argument("--events", metavar="FILE",
+                          help="append a JSONL log of every request, icon and session event to FILE")
+    download.add_argument("--prometheus", metavar="FILE",
+                          help="keep a Prometheus text snapshot of the metrics in FILE")
+    download.set_defaults(func=run_download, needs_family=True)
+
+    verify = commands.add_parser("verify", help="delete corrupted icons so they are downloaded again")
+    verify.add_argument("root_dir", nargs="?", default=ICON_ROOT_DIR)
+    verify.add_argument("--deep", action="store_true",
+                        help="fully decode every PNG instead of only checking its chunks")
+    verify.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    verify.add_argument("--no-cache", action="store_true",
+                        help="re-check every file, ignoring the results of earlier runs")
+    verify.set_defaults(func=run_verify)
+
+    stats = commands.add_parser("stats", help="show the progress of families from their manifests")
+    add_family_arguments(stats)
+    stats.add_argument("--failed", action="store_true", help="list the links that failed")
+    stats.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    stats.set_defaults(func=run_stats, needs_family=True)
+
+    export = commands.add_parser("export", help="pack a family into an archive and SVG sprites")
+    export.add_argument("family", help="configuration name (configuration_<family>.json)")
+    export.add_argument("--format", choices=ARCHIVE_FORMATS, default="zip")
+    export.add_argument("--out", default=EXPORT_DIR, help=f"output directory (default: {EXPORT_DIR})")
+    export.add_argument("--no-sprites", action="store_true", help="only write the archive")
+    export.set_defaults(func=run_export)
+
+    optimize = commands.add_parser("optimize", help="minify the SVGs and recompress the PNGs of a family")
+    optimize.add_argument("family", help="configuration name (configuration_<family>.json)")
+    optimize.add_argument("--precision", type=int, default=None,
+                          help="decimal places kept in SVG coordinates (default: 'svg_precision' or 3)")
+    optimize.add_argument("--workers", type=int, default=None,
+                          help="number of worker processes (default: one per CPU)")
+    optimize.set_defaults(func=run_optimize)
+
+    catalog = commands.add_parser("catalog", help="rebuild the catalog.json index of families")
+    add_family_arguments(catalog)
+    catalog.set_defaults(func=run_catalog, needs_family=True)
+
+    search = commands.add_parser("search", help="find icons by name in the family catalogs")
+    search.add_argument("query", help="name prefix or substring")
+    add_family_arguments(search)
+    search.add_argument("--prefix", action="store_true", help="only names starting with the query")
+    search.add_argument("--limit", type=int, default=50, help="stop after this many names (0: no limit)")
+    search.add_argument("--json", action="store_true", help="print the matches as JSON")
+    search.set_defaults(func=run_search)
+
+    derive = commands.add_parser("derive", help="generate the configured extra PNG sizes")
+    derive.add_argument("family", help="configuration name (configuration_<family>.json)")
+    derive.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    derive.set_defaults(func=run_derive)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if getattr(args, "needs_family", False) and not args.families and not args.all:
+        parser.error("give at least one family or --all")
+    args.func(args)
@@ -0,0 +1,37 @@
+import os
+import glob
+import json
+
+# ============================================================
+# CONFIGURATION LOADER
+# ============================================================
+def load_config(family_name):
+    config_file = f"configuration_{family_name}.json"
+    if not os.path.exists(config_file):
+        raise FileNotFoundError(f"Configuration file not found: {config_file}")
+    with open(config_file, "r") as f:
+        config = json.load(f)
+    return config
+
+
+def discover_families():
+    """Names of every configuration_<name>.json in the working directory."""
+    return sorted(
+        os.path.basename(path)[len("configuration_"):-len(".json")]
+        for path in glob.glob("configuration_*.json")
+    )
+
+
+def parse_family_arg(arg):
+    """'phosphor' or 'phosphor:500' (stop after 500 links) -> (name, stop_at)."""
+    name, _, stop_at = arg.partition(":")
+    return name, int(stop_at) if stop_at else None
+
+
+def family_names(names, all_families=False):
+    """[(name, stop_at)] from the command line, plus every configuration with --all."""
+    family_args = [parse_family_arg(a) for a in names]
+    if all_families:
+        family_args += [(name, None) for name in discover_families()
+                        if name not in {n for n, _ in family_args}]
+    return family_args
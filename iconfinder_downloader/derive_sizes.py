@@ -0,0 +1,148 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .manifest import Manifest, MANIFEST_NAME
+from .planner import in_shard
+from .leases import LeaseTable
+
+# ============================================================
+# MULTI-SIZE PNG DERIVATION
+# ============================================================
+# Writes smaller PNGs next to every downloaded icon, e.g.
+# icons/phosphor/logo/regular@64.png, from the 1024px PNG (or the SVG).
+# Driven by the "png_sizes" configuration key. An icon is only
+# regenerated when one of its outputs is missing or older than its source.
+# Workers splitting a family (--shard, --leases) only derive their own icons.
+
+
+def derived_path(source_path, size):
+    stem = os.path.splitext(source_path)[0]
+    return f"{stem}@{size}.png"
+
+
+def _write_atomically(path, save):
+    tmp_path = f"{path}.{os.getpid()}.part"
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def derive_icon(job):
+    """Process pool worker. Returns (source path, error or None)."""
+    source_path, sizes = job
+    try:
+        if source_path.lower().endswith(".svg"):
+            import cairosvg
+            for size in sizes:
+                _write_atomically(derived_path(source_path, size), lambda tmp, s=size: cairosvg.svg2png(
+                    url=source_path, write_to=tmp, output_width=s, output_height=s))
+        else:
+            from PIL import Image, ImageOps
+
+            with Image.open(source_path) as img:
+                img.load()
+                for size in sizes:
+                    small = ImageOps.contain(img, (size, size), Image.LANCZOS)
+                    _write_atomically(derived_path(source_path, size),
+                                      lambda tmp: small.save(tmp, format="PNG", optimize=True))
+        return source_path, None
+    except Exception as e:
+        return source_path, str(e)
+
+
+def is_stale(source_path, sizes):
+    source_mtime = os.stat(source_path).st_mtime_ns
+    for size in sizes:
+        try:
+            if os.stat(derived_path(source_path, size)).st_mtime_ns < source_mtime:
+                return True
+        except FileNotFoundError:
+            return True
+    return False
+
+
+def find_sources(icon_dir, source="png"):
+    """The downloaded <base_name>/<icon_type>.<source> files of a family."""
+    ext = f".{source}"
+    with os.scandir(icon_dir) as folders:
+        for folder in folders:
+            if not folder.is_dir() or folder.name.startswith("."):
+                continue
+            with os.scandir(folder.path) as files:
+                for entry in files:
+                    if entry.name.endswith(ext) and "@" not in entry.name:
+                        yield entry.path
+
+
+def shard_sources(icon_dir, paths, shard):
+    """The source paths whose icon belongs to `shard`. Icons missing from
+    the manifest have no id and go to the first shard."""
+    manifest_path = os.path.join(icon_dir, MANIFEST_NAME)
+    ids = {}
+    if os.path.exists(manifest_path):
+        manifest = Manifest(manifest_path, readonly=True)
+        try:
+            ids = {f"{base_name}/{icon_type}": icon_id for icon_id, base_name, icon_type in manifest.ok_icons()}
+        finally:
+            manifest.close()
+    for path in paths:
+        key = os.path.relpath(os.path.splitext(path)[0], icon_dir).replace(os.sep, "/")
+        icon_id = ids.get(key)
+        if icon_id is None:
+            if shard[0] == 1:
+                yield path
+        elif in_shard(icon_id, shard):
+            yield path
+
+
+def lease_key(icon_dir, source_path):
+    stem = os.path.relpath(os.path.splitext(source_path)[0], icon_dir)
+    return "derive-" + stem.replace(os.sep, "-")
+
+
+def derive_family(icon_dir, sizes, source="png", workers=None, shard=None, lease_ttl=None):
+    """Generate every missing or outdated size for a family. Returns (derived, failed).
+
+    With `shard`, only the icons of that shard are derived. With
+    `lease_ttl`, each icon is claimed first, so workers sharing the
+    family don't derive the same icon at the same time.
+    """
+    sources = find_sources(icon_dir, source)
+    if shard is not None:
+        sources = shard_sources(icon_dir, sources, shard)
+    jobs = [(path, sizes) for path in sources if is_stale(path, sizes)]
+    leases = None
+    if lease_ttl is not None and jobs:
+        leases = LeaseTable(icon_dir, ttl=lease_ttl)
+        jobs = [job for job in jobs if leases.claim(lease_key(icon_dir, job[0]))]
+    print(f"🖼️  Deriving {', '.join(map(str, sizes))}px PNGs from {source.upper()} for {len(jobs)} icons")
+    if not jobs:
+        return 0, 0
+
+    derived = failed = 0
+    try:
+        # spawn: this may run after the multi-threaded downloader
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for source_path, error in pool.map(derive_icon, jobs, chunksize=16):
+                if error:
+                    failed += 1
+                    print(f"    ❌ {source_path}: {error}")
+                else:
+                    derived += 1
+    finally:
+        if leases:
+            leases.close()
+    print(f"🖼️  Derived sizes for {derived} icons, {failed} failed")
+    return derived, failed
+
+
+def derive_from_config(config, workers=None, shard=None, lease_ttl=None):
+    sizes = config.get("png_sizes")
+    if sizes:
+        derive_family(config["icon_dir"], sizes, config.get("png_sizes_source", "png"), workers,
+                      shard=shard, lease_ttl=lease_ttl)
+
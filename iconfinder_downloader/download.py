@@ -0,0 +1,981 @@
+import io
+import os
+import re
+import sys
+import time
+import random
+import itertools
+import queue
+import asyncio
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from .rate_control import RateController
+from .session_pool import SessionPool, OUTCOME_CORRUPT, OUTCOME_ERROR, outcome_for_status
+from .metrics import metrics
+from .verify import png_decode_error, png_structure_error, svg_error
+from .manifest import Manifest, STATUS_PREMIUM, file_sha256
+from . import rasterize
+from . import derive_sizes
+from . import optimize
+from .catalog import build_catalog
+from .blobstore import BlobStore
+from .config import load_config, family_names
+from .planner import parse_icon_link, in_shard, plan_downloads, report_plan
+from .leases import LeaseTable, DEFAULT_LEASE_TTL
+from .retry_queue import RetryQueue, backoff_delay
+from .scraper import iter_icon_links
+from .http_scraper import iter_icon_links_http, DEFAULT_MAX_PAGES, DEFAULT_PAGE_PARAM, DEFAULT_WORKERS
+
+# ============================================================
+# DOWNLOAD + VALIDATION LOGIC
+# ============================================================
+def compile_icon_regex(icon_types):
+    type_alt = "|".join(re.escape(t) for t in icon_types)
+    return re.compile(rf"/icons/(\d+)/([a-z0-9_]+?)(?:_({type_alt}))?_icon$", re.IGNORECASE)
+
+
+# ============================================================
+# CONCURRENCY
+# ============================================================
+# Number of requests allowed in flight per host. 1 keeps the original
+# strictly sequential behaviour (one icon, one file at a time).
+DEFAULT_CONCURRENCY = 1
+concurrency = DEFAULT_CONCURRENCY
+host_slots = {}
+host_slots_lock = threading.Lock()
+pair_pool = None  # Fetches the SVG of an icon while its PNG downloads
+
+
+def set_concurrency(n):
+    """Configure the number of in-flight requests allowed per host."""
+    global concurrency, pair_pool
+    concurrency = max(1, int(n))
+    with host_slots_lock:
+        host_slots.clear()
+    if pair_pool:
+        pair_pool.shutdown(wait=False)
+    pair_pool = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+
+
+def host_slot(url):
+    """Semaphore bounding the in-flight requests to the host of `url`."""
+    host = urlparse(url).netloc
+    with host_slots_lock:
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(concurrency)
+        return host_slots[host]
+
+
+# Shared pacing for every request, replaced from the config in main
+rate_controller = RateController()
+
+
+# ============================================================
+# SESSION HANDLING (NEW)
+# ============================================================
+session_pool = None
+PROXIES = []  # Optional: add proxies if available, each session gets its own
+
+
+def init_session_pool(config=None, size=None):
+    """(Re)create the session pool; `size` overrides the 'sessions' config key."""
+    global session_pool
+    if session_pool:
+        session_pool.close()
+    session_pool = SessionPool.from_config(config or {}, proxies=PROXIES,
+                                           pool_maxsize=max(10, concurrency), size=size)
+    print(f"🔗 {len(session_pool.members)} session(s) ready")
+
+
+# ============================================================
+# VALIDATION HELPERS
+# ============================================================
+def validation_error(source, file_path):
+    """What is wrong with the PNG or SVG in `source` (a path or a file
+    object), judged by the extension of `file_path`, or None."""
+    if file_path.lower().endswith(".png"):
+        return png_decode_error(source)
+    elif file_path.lower().endswith(".svg"):
+        return svg_error(source)
+    return None
+
+
+def is_stored_file_sound(file_path):
+    """Cheap check of a file a download already validated before moving it
+    into place: the PNG chunk structure or the SVG parse, no decoding."""
+    if not os.path.exists(file_path):
+        return False
+    with metrics.timed("validating"):
+        if file_path.lower().endswith(".png"):
+            return png_structure_error(file_path) is None
+        return validation_error(file_path, file_path) is None
+
+
+def is_file_corrupted(file_path):
+    if not os.path.exists(file_path):
+        return True
+    with metrics.timed("validating"):
+        return validation_error(file_path, file_path) is not None
+
+
+def is_payload_corrupted(data, file_path):
+    """Same checks as is_file_corrupted, on a body still held in memory."""
+    if not data:
+        return True
+    with metrics.timed("validating"):
+        return validation_error(io.BytesIO(data), file_path) is not None
+
+
+ERROR_BODY_LIMIT = 64 * 1024
+
+
+def drain_body(resp, limit=ERROR_BODY_LIMIT):
+    """Read a small error body, so closing the response returns its
+    keep-alive connection to the pool instead of dropping it."""
+    read = 0
+    try:
+        for chunk in resp.iter_content(16 * 1024):
+            read += len(chunk)
+            if read > limit:
+                return  # Not worth reading, the connection is dropped
+    except Exception:
+        pass
+
+
+def stream_to_file(resp, path, chunk_size=64 * 1024, store=None):
+    """Stream a response body into `path` atomically.
+
+    The body is written to a temp file in the same directory while it is
+    buffered and hashed, and only replaces `path` once the buffered bytes
+    validate. With a BlobStore the body goes into the store and `path`
+    becomes a link to it. Returns the SHA-256 of the stored body, or None
+    if it was empty or corrupted (nothing is left on disk in that case).
+    """
+    folder, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{name}.", suffix=".part")
+    buf = bytearray()
+    digest = hashlib.sha256()
+    try:
+        start = time.monotonic()
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in resp.iter_content(chunk_size):
+                fh.write(chunk)
+                buf += chunk
+                digest.update(chunk)
+        metrics.observe_body(len(buf), time.monotonic() - start)
+        if is_payload_corrupted(bytes(buf), path):
+            os.remove(tmp_path)
+            return None
+        if store:
+            blob = store.put(tmp_path, digest.hexdigest(), os.path.splitext(path)[1])
+            store.materialize(blob, path)
+        else:
+            os.replace(tmp_path, path)
+        return digest.hexdigest()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_icon_file(path, store=None, digest=None):
+    """Delete `path` if it exists. With a BlobStore, its blob is deleted
+    too unless other icons link to it; `digest` names the blob and is
+    read from the file when not given."""
+    if not os.path.exists(path):
+        return
+    if store:
+        digest = digest or file_sha256(path)
+    os.remove(path)
+    if store:
+        store.discard_unused(digest, os.path.splitext(path)[1])
+
+
+# ============================================================
+# CONDITIONAL RE-SYNC (--refresh)
+# ============================================================
+def response_validators(resp):
+    return (resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+            resp.headers.get("Content-Length"))
+
+
+def revalidate_file(url, path, stored, fetch, not_modified, validators, served_size=None):
+    """Check one existing file against the server.
+
+    Sends If-None-Match / If-Modified-Since when validators were stored
+    with the file. Without them a HEAD request compares Content-Length
+    with the local size, or with `served_size` for files the optimizer
+    rewrote. The file is only downloaded again when it changed.
+    Returns "unchanged", "updated" or "failed".
+    """
+    headers = {}
+    if stored is not None and stored["etag"]:
+        headers["If-None-Match"] = stored["etag"]
+    if stored is not None and stored["last_modified"]:
+        headers["If-Modified-Since"] = stored["last_modified"]
+
+    if not headers:
+        try:
+            with metrics.timed("sleeping"):
+                rate_controller.acquire()
+            with host_slot(url), session_pool.lease() as member:
+                start = time.monotonic()
+                try:
+                    resp = member.session.head(url, timeout=15, allow_redirects=True)
+                except Exception:
+                    session_pool.report(member, OUTCOME_ERROR)
+                    raise
+                metrics.observe_request(url, resp.status_code, time.monotonic() - start)
+                session_pool.report(member, outcome_for_status(resp.status_code))
+            if resp.status_code == 429:
+                rate_controller.on_throttle(resp.headers.get("Retry-After"))
+                return "failed"
+            length = resp.headers.get("Content-Length")
+            if resp.status_code == 200 and length and int(length) == (served_size or os.path.getsize(path)):
+                # Same size: keep the file and remember the validators for next time
+                validators[path] = response_validators(resp)
+                return "unchanged"
+        except Exception as e:
+            print(f"⚠️ Error checking {url}: {e}")
+            return "failed"
+
+    result = fetch(url, path, headers or None)
+    if path in not_modified:
+        return "unchanged"
+    return "updated" if result else "failed"
+
+
+# ============================================================
+# CORE DOWNLOAD FUNCTION
+# ============================================================
+# Host the icons are downloaded from (the benchmark points it at a mock server)
+BASE_URL = "https://www.iconfinder.com"
+
+# What download_icon returns when the icon isn't finished
+ICON_DEFERRED = "deferred"  # this attempt failed, try again later
+ICON_FAILED = "failed"      # out of attempts, recorded as failed
+
+
+def download_icon(link, icon_dir, icon_re, remove_prefix, max_retries=10, manifest=None, store=None,
+                  render=False, refresh=False, attempt=1):
+    """Make attempt number `attempt` at one icon.
+
+    A failed attempt is not repeated here: the icon is handed back with
+    ICON_DEFERRED so the caller can retry it later (see retry_queue.py)
+    while other icons go ahead. The attempt that reaches `max_retries`
+    records the icon as failed and returns ICON_FAILED.
+    """
+    parsed = parse_icon_link(link, icon_re, remove_prefix)
+    if parsed is None:
+        print(f"⚠️  Could not parse link: {link}")
+        if manifest:
+            manifest.record_unparseable(link)
+        metrics.event("icon", link=link, status="unparseable")
+        return
+    icon_id, base_name, icon_type = parsed
+
+    def _report(status, **fields):
+        metrics.count(f"icons_{status}")
+        metrics.event("icon", id=icon_id, name=f"{base_name}/{icon_type}", status=status, **fields)
+
+    if manifest:
+        entry = manifest.get(icon_id)
+        if entry is not None and entry["status"] == STATUS_PREMIUM:
+            print(f"⏭️  Skipping known premium: {base_name}/{icon_type}")
+            _report("skipped_premium")
+            return
+
+    folder_path = os.path.join(icon_dir, base_name)
+    os.makedirs(folder_path, exist_ok=True)
+
+    svg_path = os.path.join(folder_path, f"{icon_type}.svg")
+    png_path = os.path.join(folder_path, f"{icon_type}.png")
+
+    existing_valid = False
+    if os.path.exists(svg_path) and os.path.exists(png_path):
+        # Files unchanged since they were verified don't need decoding again
+        if manifest and manifest.is_verified(icon_id, svg_path, png_path):
+            existing_valid = True
+        elif not is_file_corrupted(svg_path) and not is_file_corrupted(png_path):
+            if manifest:
+                manifest.record_ok(icon_id, link, base_name, icon_type, svg_path, png_path)
+            existing_valid = True
+        if existing_valid and not refresh:
+            print(f"⏭️  Skipping existing valid: {base_name}/{icon_type}")
+            _report("skipped")
+            return
+        elif not existing_valid:
+            print(f"⚠️ Found existing corrupted files, will re-download {base_name}/{icon_type}")
+            entry = manifest.get(icon_id) if manifest else None
+            try:
+                # The stored hashes name the blobs even if a blob itself went bad
+                remove_icon_file(svg_path, store, entry and entry["svg_hash"])
+                remove_icon_file(png_path, store, entry and entry["png_hash"])
+            except Exception as e:
+                print(f"⚠️ Could not remove old corrupted files: {e}")
+
+    base_download_url = f"{BASE_URL}/icons/{icon_id}/download"
+    svg_url = f"{base_download_url}/svg/4096"
+    png_url = f"{base_download_url}/png/1024"
+
+    digests = {}       # path -> SHA-256 of the body stored there
+    corrupted = set()   # paths whose last body failed validation
+    validators = {}     # path -> (ETag, Last-Modified, Content-Length) it was served with
+    not_modified = set()
+
+    def _fetch_to_file(url, path, headers=None):
+        with metrics.timed("sleeping"):
+            rate_controller.acquire()
+        # The host slot is held until the body is read, so --concurrency
+        # bounds the transfers and not only the requests; every outcome
+        # is scored against the session that produced it
+        with host_slot(url), session_pool.lease() as member:
+            outcome = OUTCOME_ERROR
+            try:
+                start = time.monotonic()
+                resp = member.session.get(url, timeout=15, stream=True, headers=headers)
+                metrics.observe_request(url, resp.status_code, time.monotonic() - start)
+                with resp:
+                    outcome = outcome_for_status(resp.status_code)
+                    if resp.status_code == 304:
+                        rate_controller.on_success()
+                        not_modified.add(path)
+                        return True
+                    if resp.status_code == 200:
+                        rate_controller.on_success()
+                        digest = stream_to_file(resp, path, store=store)
+                        if digest is None:
+                            outcome = OUTCOME_CORRUPT
+                            corrupted.add(path)
+                            metrics.count("corrupted_bodies")
+                            return False
+                        digests[path] = digest
+                        validators[path] = response_validators(resp)
+                        return True
+                    drain_body(resp)
+                    if resp.status_code == 429:
+                        # The controller pauses every caller until the server is ready
+                        rate_controller.on_throttle(resp.headers.get("Retry-After"))
+                        return False
+                    if resp.status_code == 403:
+                        print(f"❌ Premium icon, skipping...")
+                        return None
+                    print(f"⚠️ Download failed ({resp.status_code}) for {url}")
+            except Exception as e:
+                outcome = OUTCOME_ERROR
+                print(f"⚠️ Error downloading {url}: {e}")
+                metrics.count("request_errors")
+                metrics.event("request_error", url=url, error=str(e))
+            finally:
+                session_pool.report(member, outcome)
+        #time.sleep(random.uniform(2.0, 3.0))
+        return False
+
+    def _record_validators():
+        if manifest:
+            for path, (etag, last_modified, length) in validators.items():
+                kind = os.path.splitext(path)[1][1:]
+                manifest.record_validators(icon_id, kind, etag, last_modified, length)
+
+    if existing_valid:
+        # --refresh: only rewrite the files that changed upstream
+        stored = manifest.get_validators(icon_id) if manifest else {}
+        originals = manifest.get_optimized(icon_id) if manifest else {}
+        entry = manifest.get(icon_id) if manifest else None
+        # Blobs the current files link to, released when a file is rewritten
+        old_digests = {}
+        if store:
+            old_digests = {svg_path: (entry and entry["svg_hash"]) or file_sha256(svg_path),
+                           png_path: (entry and entry["png_hash"]) or file_sha256(png_path)}
+        checks = [("svg", svg_url, svg_path)]
+        # A rendered PNG has no validators and doesn't match the server's
+        # PNG; it is rendered again when the SVG changes instead. PNGs
+        # downloaded because rendering failed are checked as usual.
+        rendered_png = render and "png" not in stored
+        if not rendered_png:
+            checks.append(("png", png_url, png_path))
+        outcomes = [
+            revalidate_file(url, path, stored.get(kind), _fetch_to_file, not_modified, validators,
+                            served_size=originals[kind]["original_size"] if kind in originals else None)
+            for kind, url, path in checks
+        ]
+        if rendered_png and outcomes[0] == "updated":
+            digest = rasterize.render_to_file(svg_path, png_path, store=store)
+            if digest:
+                digests[png_path] = digest
+            else:
+                outcomes.append("failed")
+        for path, digest in digests.items():
+            if old_digests.get(path, digest) != digest:
+                store.discard_unused(old_digests[path], os.path.splitext(path)[1])
+        if "updated" in outcomes and manifest:
+            manifest.record_ok(icon_id, link, base_name, icon_type, svg_path, png_path,
+                               svg_hash=digests.get(svg_path) or (entry and entry["svg_hash"]),
+                               png_hash=digests.get(png_path) or (entry and entry["png_hash"]))
+        _record_validators()
+        if "failed" in outcomes:
+            print(f"⚠️ Could not revalidate {base_name}/{icon_type}, keeping the current files")
+            _report("refresh_failed")
+        elif "updated" in outcomes:
+            print(f"🔄 Updated changed files of {base_name}/{icon_type}")
+            _report("refresh_updated")
+        else:
+            print(f"✔️  Unchanged upstream: {base_name}/{icon_type}")
+            _report("refresh_unchanged")
+        return
+
+    # Files already stored are valid (atomic writes), so retries only
+    # fetch what is still missing. When rendering, the PNG is only
+    # requested if it can't be rendered from the SVG.
+    pending = {svg_url: svg_path} if render else {svg_url: svg_path, png_url: png_path}
+    for url, path in list(pending.items()):
+        if is_stored_file_sound(path):
+            del pending[url]
+
+    items = list(pending.items())
+    if pair_pool and len(items) > 1:
+        futures = [pair_pool.submit(_fetch_to_file, url, path) for url, path in items[1:]]
+        results = [_fetch_to_file(*items[0])] + [f.result() for f in futures]
+    else:
+        results = [_fetch_to_file(url, path) for url, path in items]
+
+    def _record_premium():
+        remove_icon_file(svg_path, store, digests.get(svg_path))
+        remove_icon_file(png_path, store, digests.get(png_path))
+        if manifest:
+            manifest.record_premium(icon_id, link, base_name, icon_type)
+        _report("premium")
+
+    if None in results:
+        _record_premium()
+        return
+
+    for (url, path), ok in zip(items, results):
+        if ok:
+            del pending[url]
+
+    if not pending and not os.path.exists(png_path):
+        digest = rasterize.render_to_file(svg_path, png_path, store=store)
+        if digest:
+            digests[png_path] = digest
+        else:
+            print(f"⚠️ Rendering failed, downloading the PNG of {base_name}/{icon_type}")
+            result = _fetch_to_file(png_url, png_path)
+            if result is None:
+                _record_premium()
+                return
+            if not result:
+                pending[png_url] = png_path
+
+    if not pending:
+        print(f"✅ Downloaded {base_name}/{icon_type} (try {attempt})")
+        if manifest:
+            manifest.record_ok(icon_id, link, base_name, icon_type, svg_path, png_path,
+                               svg_hash=digests.get(svg_path), png_hash=digests.get(png_path))
+        _record_validators()
+        _report("downloaded", attempts=attempt)
+        return
+
+    if corrupted:
+        # The session pool recycles the session if it keeps serving bad bodies
+        print(f"❌ Corrupted file detected on try {attempt} for {base_name}/{icon_type}")
+    if attempt < max_retries:
+        _report("deferred", attempt=attempt)
+        return ICON_DEFERRED
+
+    print(f"❌ Failed after {max_retries} tries: {base_name}/{icon_type}")
+    if manifest:
+        manifest.record_failed(icon_id, link, base_name, icon_type)
+    _report("failed", attempts=max_retries)
+    return ICON_FAILED
+
+
+# ============================================================
+# STREAMING (SCRAPE WHILE DOWNLOADING)
+# ============================================================
+STREAM_QUEUE_SIZE = 2000
+
+
+class LinkStream:
+    """Runs a link generator in a background thread and hands its links to
+    the download engine through a bounded queue as they are discovered.
+
+    Every link is also kept in `links` so the links file can be written
+    once the scrape is complete.
+    """
+    _DONE = object()
+
+    def __init__(self, generator, maxsize=STREAM_QUEUE_SIZE):
+        self.links = []
+        self.error = None
+        self.finished = False
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, args=(generator,), daemon=True)
+        self._thread.start()
+
+    def _run(self, generator):
+        try:
+            for link in generator:
+                self.links.append(link)
+                self._queue.put(link)
+            self.finished = True
+        except Exception as e:
+            self.error = e
+            print(f"⚠️ Scraper stopped: {e}")
+        finally:
+            self._queue.put(self._DONE)
+
+    def __iter__(self):
+        while True:
+            link = self._queue.get()
+            if link is self._DONE:
+                return
+            yield link
+
+
+# ============================================================
+# DOWNLOAD ENGINES
+# ============================================================
+def link_total(links):
+    """Number of links for progress output, "?" while they are still streaming."""
+    return len(links) if hasattr(links, "__len__") else "?"
+
+
+def retry_label(family, link):
+    """Progress prefix of a deferred icon coming back, or None for a fresh
+    link. Only fresh links are numbered, so the count stays within the total."""
+    attempts = family.attempts.get(link)
+    if attempts is None:
+        return None
+    if attempts == 0:
+        return "[re-check]"  # another worker held its lease
+    return f"[try {attempts + 1}/{family.max_retries}]"
+
+
+def download_all_sequential(items, total):
+    global stop_requested
+    # `items` may block too (a LinkStream, or the retries waiting to come
+    # due), so Ctrl+C is caught around the whole loop
+    try:
+        number = 0
+        for family, link in items:
+            label = retry_label(family, link)
+            if label is None:
+                number += 1
+                label = f"[{number}/{total}]"
+            print(f"\n{label} ({family.progress()}) Processing: {link}")
+            try:
+                family.download(link)
+            except Exception as e:
+                print(f"⚠️ Unexpected error: {e}")
+                time.sleep(random.uniform(2.0, 3.0))
+            metrics.maybe_print_progress(metrics.counters.get("icons_done", 0), total)
+    except KeyboardInterrupt:
+        stop_requested = True
+        print("\n🛑 Interrupted by user.")
+
+
+async def _download_worker(work):
+    while True:
+        item = await work.get()
+        try:
+            if item is None:
+                return
+            label, total, family, link = item
+            print(f"\n{label} ({family.progress()}) Processing: {link}")
+            try:
+                await asyncio.to_thread(family.download, link)
+            except Exception as e:
+                print(f"⚠️ Unexpected error: {e}")
+                await asyncio.sleep(random.uniform(2.0, 3.0))
+            metrics.maybe_print_progress(metrics.counters.get("icons_done", 0), total)
+        finally:
+            work.task_done()
+
+
+async def download_all_async(items, total, workers):
+    """Overlap up to `workers` icons; the SVG and PNG of each icon are fetched
+    in parallel and every request is bounded by the per-host slots."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+    work = asyncio.Queue(maxsize=workers * 2)
+    tasks = [asyncio.create_task(_download_worker(work)) for _ in range(workers)]
+    # Links may come from a LinkStream that blocks until the scraper finds
+    # more, so they are pulled on a thread of their own
+    feeder = ThreadPoolExecutor(max_workers=1)
+    item_iter = iter(items)
+    number = 0
+    while True:
+        item = await loop.run_in_executor(feeder, next, item_iter, None)
+        if item is None:
+            break
+        label = retry_label(*item)
+        if label is None:
+            number += 1
+            label = f"[{number}/{total}]"
+        await work.put((label, total, *item))
+    feeder.shutdown()
+    for _ in tasks:
+        await work.put(None)
+    await asyncio.gather(*tasks)
+
+
+def download_all(items, total="?"):
+    """Download every (family, link) pair of `items`."""
+    global stop_requested
+    if concurrency <= 1:
+        download_all_sequential(items, total)
+        return
+    print(f"⚡ Concurrent mode: up to {concurrency} requests in flight per host")
+    try:
+        asyncio.run(download_all_async(items, total, concurrency))
+    except KeyboardInterrupt:
+        stop_requested = True
+        print("\n🛑 Interrupted by user.")
+
+
+# ============================================================
+# FAMILIES AND SCHEDULING
+# ============================================================
+class Family:
+    """One icon family: its configuration, links, manifest and progress."""
+
+    def __init__(self, name, config, stop_at=None, refresh=False, shard=None, lease_ttl=None):
+        self.name = name
+        self.config = config
+        self.icon_dir = config["icon_dir"]
+        self.links_file = config["links_file"]
+        self.partial_file = self.links_file + ".partial"
+        self.remove_prefix = config["prefix_to_remove"]
+        self.icon_re = compile_icon_regex(config["icon_types"])
+        # Stop after this many links (name:N on the command line or "stop_at")
+        self.stop_at = stop_at or config.get("stop_at")
+        # Revalidate finished icons against the server (--refresh)
+        self.refresh = refresh
+        self.links = []
+        self.stream = None
+        self.manifest = None
+        # Several workers on one family: this worker's (index, count) shard,
+        # and per-icon leases that expire after lease_ttl seconds (--leases)
+        self.shard = shard
+        self.lease_ttl = lease_ttl
+        self.leases = None
+        # Failed attempts so far of the links waiting in retry_queue, and
+        # the links that ran out of attempts (or were left in the queue)
+        self.max_retries = config.get("max_retries", DEFAULT_MAX_RETRIES)
+        self.attempts = {}
+        self.unresolved = []
+        # Optional content-addressed storage ("dedup": true)
+        self.store = BlobStore(self.icon_dir) if config.get("dedup") else None
+        # "png_source": "render" draws the PNG from the SVG instead of requesting it
+        self.render = config.get("png_source", "download") == "render"
+        if self.render and not rasterize.is_available():
+            print("⚠️ cairosvg is not installed, PNGs will be downloaded instead of rendered")
+            self.render = False
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        os.makedirs(self.icon_dir, exist_ok=True)
+        shared = self.shard is not None or self.lease_ttl is not None
+        self.manifest = Manifest.for_family(self.icon_dir, shared=shared)
+        print(f"📒 Manifest {self.manifest.path}: {self.manifest.counts()}")
+        if self.lease_ttl is not None:
+            self.leases = LeaseTable(self.icon_dir, ttl=self.lease_ttl)
+            print(f"🔒 Claiming icons as {self.leases.owner} (leases expire after {self.lease_ttl:.0f}s)")
+
+    def load_links(self, stream=False):
+        """Load the links file, or scrape it (streamed into the downloader if `stream`)."""
+        if os.path.exists(self.links_file):
+            with open(self.links_file, "r") as f:
+                links = [line.strip() for line in f if line.strip()]
+            print(f"Loaded {len(links)} links from {self.links_file}")
+        elif stream:
+            links = self.stream = LinkStream(self.iter_scraped_links())
+            print("🔀 Streaming links from the scraper into the downloader")
+            if self.shard:
+                links = (link for link in links if self.in_shard(link))
+        else:
+            links = self.scrape_links()
+
+        if self.stop_at:
+            links = links[:self.stop_at] if isinstance(links, list) else itertools.islice(links, self.stop_at)
+        if isinstance(links, list):
+            # Known links: diff them against icon_dir before any request goes out
+            plan = plan_downloads(links, self.icon_dir, self.icon_re, self.remove_prefix, self.manifest,
+                                  refresh=self.refresh, shard=self.shard)
+            print(f"[{self.name}] ", end="")
+            report_plan(plan)
+            links = plan.work
+        self.links = links
+        return links
+
+    def iter_scraped_links(self):
+        """Scrape the target URL with the configured backend, yielding links as found."""
+        config = self.config
+        backend = config.get("scraper", "selenium")
+        # Links are checkpointed as they are found, so a crashed scrape resumes
+        if backend == "http":
+            # Result pages are small; the rate controller paces them either way
+            generator = iter_icon_links_http(session_pool, config["target_url"],
+                                             max_pages=config.get("max_pages", DEFAULT_MAX_PAGES),
+                                             page_param=config.get("page_param", DEFAULT_PAGE_PARAM),
+                                             workers=concurrency if concurrency > 1 else DEFAULT_WORKERS,
+                                             rate_controller=rate_controller,
+                                             checkpoint_file=self.partial_file)
+        else:
+            generator = iter_icon_links(config["target_url"], config["link_css"],
+                                        config["scroll_pause_time"], config["max_scrolls"],
+                                        config["headless_mode"], checkpoint_file=self.partial_file)
+        return instrumented_scrape(generator, self.name, backend)
+
+    def scrape_links(self):
+        """Scrape every link and write the links file."""
+        links = sorted(self.iter_scraped_links())
+        self.save_links(links)
+        return links
+
+    def save_links(self, links):
+        with open(self.links_file, "w") as f:
+            for link in sorted(links):
+                f.write(link + "\n")
+        if os.path.exists(self.partial_file):
+            os.remove(self.partial_file)
+        print(f"Saved {len(links)} links to {self.links_file}")
+
+    def in_shard(self, link):
+        parsed = parse_icon_link(link, self.icon_re, self.remove_prefix)
+        return parsed is None or in_shard(parsed[0], self.shard)
+
+    def download(self, link):
+        parsed = parse_icon_link(link, self.icon_re, self.remove_prefix) if self.leases else None
+        if parsed and not self.leases.claim(parsed[0]):
+            # Icons the other worker finishes are skipped on the next pass
+            # (the manifest is shared); leases of dead workers expire
+            pause = min(LEASE_RETRY_PAUSE, self.lease_ttl / 4)
+            print(f"⏸️  Another worker holds {link}, checking it again in {pause:.0f}s")
+            metrics.count("leases_busy")
+            with self._lock:
+                self.attempts.setdefault(link, 0)  # marks it as a re-check, not a fresh link
+            retry_queue.push((self, link), pause)
+            return
+        attempt = self.attempts.get(link, 0) + 1
+        status = None
+        try:
+            status = download_icon(link, self.icon_dir, self.icon_re, self.remove_prefix,
+                                   max_retries=self.max_retries, manifest=self.manifest,
+                                   store=self.store, render=self.render, refresh=self.refresh,
+                                   attempt=attempt)
+        finally:
+            if parsed:
+                self.leases.release(parsed[0])
+            if status == ICON_DEFERRED:
+                delay = backoff_delay(attempt)
+                print(f"⏳ Retrying {link} in {delay:.0f}s (try {attempt}/{self.max_retries} failed)")
+                with self._lock:
+                    self.attempts[link] = attempt
+                retry_queue.push((self, link), delay)
+            else:
+                with self._lock:
+                    self.attempts.pop(link, None)
+                    if status == ICON_FAILED:
+                        self.unresolved.append(link)
+                    self.done += 1
+                metrics.count("icons_done")
+
+    def progress(self):
+        return f"{self.name} {self.done}/{link_total(self.links)}"
+
+    def close(self):
+        # Finalize the links file once the streamed scrape has completed
+        if self.stream is not None and self.stream.finished:
+            self.save_links(self.stream.links)
+        print(f"📊 {self.name}: {self.done} links processed, manifest {self.manifest.counts()}")
+        if self.store:
+            print(f"🧬 {self.name}: {self.store.summary()}")
+        if self.leases:
+            self.leases.close()
+        self.manifest.close()
+
+
+# ============================================================
+# DEFERRED RETRIES
+# ============================================================
+# (family, link) pairs of failed attempts, and of icons another worker
+# held a lease on, waiting to be tried again
+DEFAULT_MAX_RETRIES = 10
+LEASE_RETRY_PAUSE = 30.0
+retry_queue = RetryQueue()
+stop_requested = False  # set on Ctrl+C, so the retries aren't drained
+
+
+def with_retries(items):
+    """`items` with the deferred icons mixed back in as they come due."""
+    for item in items:
+        yield from retry_queue.pop_due()
+        yield item
+    yield from retry_queue.pop_due()
+
+
+def iter_due_retries():
+    """Deferred icons as they come due, until the queue is empty."""
+    while not stop_requested:
+        due = retry_queue.pop_due()
+        if due:
+            yield from due
+            continue
+        wait = retry_queue.next_due()
+        if wait is None:
+            return
+        # Short naps, so items pushed by icons still in flight aren't missed
+        time.sleep(min(wait, 1.0))
+
+
+def drain_retries():
+    """Retry the deferred icons left once every link has been tried."""
+    # Icons still in flight in one pass may be deferred again, hence the loop
+    while len(retry_queue) and not stop_requested:
+        print(f"\n⏳ {len(retry_queue)} deferred icons left, "
+              f"next one due in {retry_queue.next_due():.0f}s")
+        download_all(iter_due_retries())
+
+
+def report_unresolved(families):
+    """List the icons that failed every attempt or were still waiting at exit."""
+    for family, link in retry_queue.clear():
+        family.unresolved.append(link)
+    unresolved = [(family, link) for family in families for link in family.unresolved]
+    if not unresolved:
+        return
+    print(f"\n❌ {len(unresolved)} icons unresolved:")
+    for family, link in unresolved:
+        attempts = family.attempts.get(link)
+        note = f" (waiting after {attempts} tries)" if attempts else ""
+        print(f"    [{family.name}] {link}{note}")
+    metrics.event("unresolved", icons=[link for _, link in unresolved])
+
+
+def instrumented_scrape(generator, family, backend):
+    """Pass links through while recording the scrape in the metrics."""
+    start = time.monotonic()
+    found = 0
+    metrics.event("scrape_start", family=family, backend=backend)
+    try:
+        for link in generator:
+            found += 1
+            yield link
+    finally:
+        elapsed = time.monotonic() - start
+        metrics.add_time("scraping", elapsed)
+        metrics.event("scrape_done", family=family, backend=backend, links=found, seconds=round(elapsed, 1))
+
+
+def interleave(families):
+    """Round-robin (family, link) pairs so every family gets an equal share
+    of the shared connection pool and request budget."""
+    iterators = [(family, iter(family.links)) for family in families]
+    while iterators:
+        for entry in list(iterators):
+            family, links = entry
+            link = next(links, None)
+            if link is None:
+                iterators.remove(entry)
+                continue
+            yield family, link
+
+
+# ============================================================
+# ENTRY POINTS (see cli.py)
+# ============================================================
+def setup(configs, concurrency_override=None, sessions=None):
+    """One connection pool and one request budget shared by every family;
+    the pacing limits come from the first configuration."""
+    global rate_controller
+
+    set_concurrency(concurrency_override or max(c.get("concurrency", DEFAULT_CONCURRENCY) for c in configs))
+    rasterize.render_workers = max(c.get("render_workers", 0) for c in configs) or None
+    rate_controller = RateController.from_config(configs[0])
+    init_session_pool(configs[0], sessions or max(c.get("sessions", 1) for c in configs))
+
+
+def scrape(args):
+    """`scrape`: collect the links files without downloading anything."""
+    families = [Family(name, load_config(name)) for name, _ in family_names(args.families, args.all)]
+    setup([family.config for family in families], args.concurrency, args.sessions)
+    for family in families:
+        if os.path.exists(family.links_file) and not args.force:
+            print(f"⏭️  {family.links_file} already exists (--force scrapes it again)")
+            continue
+        family.scrape_links()
+    print("\n✅ Done!")
+
+
+def download(args):
+    """`download`: scrape if needed, then download every family."""
+    if args.events:
+        metrics.open_log(args.events)
+    metrics.snapshot_path = args.prometheus
+
+    lease_ttl = args.lease_ttl or (DEFAULT_LEASE_TTL if args.leases else None)
+    families = [Family(name, load_config(name), stop_at, refresh=args.refresh,
+                       shard=args.shard, lease_ttl=lease_ttl)
+                for name, stop_at in family_names(args.families, args.all)]
+    setup([family.config for family in families], args.concurrency, args.sessions)
+
+    stream = args.stream
+    if stream and len(families) > 1:
+        print("⚠️ --stream only works with a single family, scraping first instead")
+        stream = False
+
+    # However the run ends, the unresolved icons are reported and every
+    # opened family releases its leases and closes its manifest
+    opened = []
+    try:
+        for family in families:
+            family.open()
+            opened.append(family)
+            family.load_links(stream=stream)
+
+        if len(families) == 1:
+            family = families[0]
+            items = ((family, link) for link in family.links)
+            total = link_total(family.links)
+        else:
+            items = interleave(families)
+            total = sum(len(family.links) for family in families)
+            print(f"🗂️  Scheduling {len(families)} families: {', '.join(f.name for f in families)}")
+
+        print(f"\n--- Total links: {total} ---\n")
+
+        download_all(with_retries(items), total)
+        drain_retries()
+    finally:
+        report_unresolved(opened)
+        for family in opened:
+            family.close()
+        rasterize.shutdown()
+
+        print(f"📈 {metrics.summary()}")
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus)
+        metrics.event("run_done", summary=metrics.summary())
+        metrics.close()
+
+    if stop_requested:
+        # An interrupted run skips the post-processing; the next run does it
+        print("\n🛑 Stopped before post-processing (optimize, PNG sizes, catalog).")
+        sys.exit(130)
+
+    # Post-processing: smaller files for families with "optimize", then
+    # extra PNG sizes for families with "png_sizes"
+    for family in families:
+        shared = family.lease_ttl is not None or family.shard is not None
+        optimize.optimize_from_config(family.config, shard=family.shard, shared=shared)
+        derive_sizes.derive_from_config(family.config, shard=family.shard, lease_ttl=family.lease_ttl)
+        build_catalog(family.name, family.icon_dir, shared=shared)
+
+    print("\n✅ Done!")
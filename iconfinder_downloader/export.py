@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import struct
+import tarfile
+import zipfile
+from xml.etree import ElementTree as ET
+
+# ============================================================
+# PACKED EXPORTS
+# ============================================================
+# Packs a finished family into a few files: one archive of icon_dir,
+# one SVG sprite per style and a JSON index mapping icon names to
+# archive offsets and sprite symbol ids.
+EXPORT_DIR = "exports"
+SVG_NS = "http://www.w3.org/2000/svg"
+ARCHIVE_FORMATS = {"zip": "zip", "tar": "w", "tar.gz": "w:gz"}
+
+# Already-compressed formats are stored as is in zip archives
+STORED_EXTENSIONS = (".png",)
+
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+# Attributes of an icon's <svg> root that describe the document rather
+# than how its shapes are painted; the others (fill, stroke, ...) are
+# inherited by the shapes, so they move to the <symbol>
+DOCUMENT_ATTRIBUTES = {"width", "height", "viewBox", "x", "y", "id", "version", "baseProfile"}
+URL_REF_RE = re.compile(r"url\(\s*['\"]?#([^)'\"\s]+)['\"]?\s*\)")
+HREF_ATTRIBUTES = ("href", f"{{{XLINK_NS}}}href")
+
+# Size of a zip local file header before its name and extra field
+ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+def iter_icon_files(icon_dir):
+    """(relative path, absolute path) of every icon file, in a stable order.
+
+    Bookkeeping files and folders (manifest, caches, blob store) start
+    with a dot and are left out.
+    """
+    for dirpath, dirnames, filenames in os.walk(icon_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.startswith(".") or filename.endswith(".part"):
+                continue
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, icon_dir).replace(os.sep, "/"), path
+
+
+def write_zip(icon_dir, out_path):
+    """Stream every icon into a zip archive. Returns {name: {offset, size, stored_size}}.
+
+    Offsets point at the file data, as in write_tar; `stored_size` is the
+    length of the (possibly deflated) data there.
+    """
+    headers = {}
+    with zipfile.ZipFile(out_path, "w") as zf:
+        for name, path in iter_icon_files(icon_dir):
+            compression = zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            zf.write(path, name, compress_type=compression)
+            info = zf.getinfo(name)
+            headers[name] = info.header_offset, info.file_size, info.compress_size
+
+    # The data follows the local header, whose extra field can differ from
+    # the central directory's, so its lengths are read back from the file
+    index = {}
+    with open(out_path, "rb") as fh:
+        for name, (header_offset, size, stored_size) in headers.items():
+            fh.seek(header_offset)
+            fields = ZIP_LOCAL_HEADER.unpack(fh.read(ZIP_LOCAL_HEADER.size))
+            name_length, extra_length = fields[-2:]
+            offset = header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+            index[name] = {"offset": offset, "size": size, "stored_size": stored_size}
+    return index
+
+
+def write_tar(icon_dir, out_path, mode):
+    """Stream every icon into a tar archive. Returns {name: {offset, size}}.
+
+    Offsets point at the file data in the uncompressed tar stream.
+    Hardlinked files (dedup storage) are stored once and linked; their
+    entries point at the data of the link target, named in `link`.
+    """
+    index = {}
+    with tarfile.open(out_path, mode) as tf:
+        for name, path in iter_icon_files(icon_dir):
+            tf.add(path, arcname=name, recursive=False)
+            info = tf.members[-1]
+            if info.islnk():
+                target = index[info.linkname]
+                index[name] = {"offset": target["offset"], "size": target["size"],
+                               "link": info.linkname}
+            else:
+                # tf.offset is now past the data, which is padded to whole blocks
+                padded = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                index[name] = {"offset": tf.offset - padded, "size": info.size,
+                               "link": None}
+            tf.members.clear()  # Don't keep every TarInfo of a 12k-file family
+    return index
+
+
+def svg_view_box(root):
+    view_box = root.get("viewBox")
+    if view_box:
+        return view_box
+    width = root.get("width", "0").rstrip("px")
+    height = root.get("height", "0").rstrip("px")
+    return f"0 0 {width} {height}"
+
+
+def make_symbol(root, symbol_id):
+    """A <symbol> holding an icon's content and its inherited presentation
+    attributes. Ids inside the icon (gradients, clip paths) are prefixed
+    with `symbol_id`, so icons in one sprite don't resolve each other's."""
+    attributes = {name: value for name, value in root.attrib.items()
+                  if name not in DOCUMENT_ATTRIBUTES and not name.startswith("{")}
+    attributes.update({"id": symbol_id, "viewBox": svg_view_box(root)})
+    symbol = ET.Element(f"{{{SVG_NS}}}symbol", attributes)
+    symbol.extend(list(root))
+
+    ids = {}
+    for element in symbol.iter():
+        if element is not symbol and element.get("id"):
+            ids[element.get("id")] = f"{symbol_id}-{element.get('id')}"
+    if not ids:
+        return symbol
+
+    def url_ref(m):
+        return f"url(#{ids[m.group(1)]})" if m.group(1) in ids else m.group(0)
+
+    for element in symbol.iter():
+        if element is not symbol and element.get("id") in ids:
+            element.set("id", ids[element.get("id")])
+        for name, value in element.attrib.items():
+            if name in HREF_ATTRIBUTES and value.startswith("#") and value[1:] in ids:
+                element.set(name, f"#{ids[value[1:]]}")
+            elif "url(" in value:
+                element.set(name, URL_REF_RE.sub(url_ref, value))
+        if element.tag == f"{{{SVG_NS}}}style" and element.text:
+            element.text = URL_REF_RE.sub(url_ref, element.text)
+    return symbol
+
+
+def write_sprites(icon_dir, out_dir, family):
+    """One <symbol id="<name>"> sprite per style. Returns {style: {file, symbols}}."""
+    by_style = {}
+    for name, path in iter_icon_files(icon_dir):
+        base_name, _, filename = name.rpartition("/")
+        style, ext = os.path.splitext(filename)
+        if ext == ".svg" and base_name and "@" not in style:
+            by_style.setdefault(style, []).append((base_name, path))
+
+    sprites = {}
+    for style, icons in sorted(by_style.items()):
+        sprite_path = os.path.join(out_dir, f"{family}-{style}-sprite.svg")
+        symbols = []
+        with open(sprite_path, "w", encoding="utf-8") as out:
+            out.write(f'<svg xmlns="{SVG_NS}" style="display:none">\n')
+            for base_name, path in icons:
+                try:
+                    root = ET.parse(path).getroot()
+                except ET.ParseError as e:
+                    print(f"⚠️ Skipping unparseable {path}: {e}")
+                    continue
+                symbol = make_symbol(root, base_name)
+                out.write(ET.tostring(symbol, encoding="unicode").replace(f' xmlns="{SVG_NS}"', "", 1))
+                out.write("\n")
+                symbols.append(base_name)
+            out.write("</svg>\n")
+        sprites[style] = {"file": os.path.basename(sprite_path), "symbols": symbols}
+        print(f"🧩 {sprite_path}: {len(symbols)} symbols")
+    return sprites
+
+
+def export_family(config, fmt="zip", out_dir=EXPORT_DIR, sprites=True):
+    family = config["family"]
+    icon_dir = config["icon_dir"]
+    os.makedirs(out_dir, exist_ok=True)
+
+    archive_path = os.path.join(out_dir, f"{family}.{fmt}")
+    print(f"📦 Writing {archive_path}...")
+    if fmt == "zip":
+        files = write_zip(icon_dir, archive_path)
+    else:
+        files = write_tar(icon_dir, archive_path, ARCHIVE_FORMATS[fmt])
+    print(f"📦 {archive_path}: {len(files)} files")
+
+    index = {
+        "family": family,
+        "archive": os.path.basename(archive_path),
+        "files": files,
+        "sprites": write_sprites(icon_dir, out_dir, family) if sprites else {},
+    }
+    index_path = os.path.join(out_dir, f"{family}.index.json")
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    print(f"🗂️  Index written to {index_path}")
+    return index_path
+
@@ -0,0 +1,117 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+from .retry_queue import backoff_delay
+from .scraper import load_checkpoint
+
+# ============================================================
+# BROWSER-FREE SCRAPER
+# ============================================================
+# Requests the search result pages directly instead of scrolling them in
+# Chrome. Selected with "scraper": "http" in the configuration. Links
+# are checkpointed like the Selenium scraper's, so a failed scrape resumes.
+BASE_URL = "https://www.iconfinder.com"
+DEFAULT_PAGE_PARAM = "page"
+DEFAULT_MAX_PAGES = 1000
+DEFAULT_WORKERS = 4
+PAGE_RETRY_DELAY = 2.0      # first wait after a connection error or 5xx
+PAGE_MAX_RETRY_DELAY = 60.0
+
+ICON_HREF_RE = re.compile(r"""href\s*=\s*["']((?:https?://[^/"']+)?/icons/\d+/[a-z0-9_]+_icon)["'?#]""",
+                          re.IGNORECASE)
+
+
+def parse_icon_links(html):
+    """All icon detail links (absolute) found in a search result page."""
+    links = set()
+    for href in ICON_HREF_RE.findall(html):
+        if href.startswith("/"):
+            href = f"{BASE_URL}{href}"
+        links.add(href)
+    return links
+
+
+def page_url(url, page, page_param=DEFAULT_PAGE_PARAM):
+    """`url` with its page parameter set to `page`."""
+    parts = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != page_param]
+    query.append((page_param, str(page)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def fetch_page(session, url, rate_controller=None, timeout=15, max_retries=10):
+    """The HTML of one result page, "" for a 404.
+
+    429s wait for the rate controller; connection errors and server
+    errors are retried with exponential backoff. Other statuses raise.
+    """
+    for attempt in range(1, max_retries + 1):
+        if rate_controller:
+            rate_controller.acquire()
+        try:
+            resp = session.get(url, timeout=timeout)
+        except OSError as e:  # requests' exceptions are IOErrors
+            error = e
+        else:
+            if resp.status_code == 404:
+                return ""
+            error = f"HTTP {resp.status_code}"
+            if resp.status_code == 429 and rate_controller:
+                rate_controller.on_throttle(resp.headers.get("Retry-After"))
+                continue
+            if resp.status_code < 500 and resp.status_code != 429:
+                resp.raise_for_status()
+                if rate_controller:
+                    rate_controller.on_success()
+                return resp.text
+        if attempt < max_retries:
+            delay = backoff_delay(attempt, PAGE_RETRY_DELAY, PAGE_MAX_RETRY_DELAY)
+            print(f"⚠️ {url}: {error}, retrying in {delay:.0f}s")
+            time.sleep(delay)
+    raise RuntimeError(f"Giving up on {url} after {max_retries} tries: {error}")
+
+
+def iter_icon_links_http(session, url, max_pages=DEFAULT_MAX_PAGES, page_param=DEFAULT_PAGE_PARAM,
+                         workers=DEFAULT_WORKERS, rate_controller=None, checkpoint_file=None):
+    """Yield icon links as result pages arrive, requesting `workers` pages at a time.
+
+    Stops at the first batch containing a page that adds no new links.
+    New links are appended to `checkpoint_file`. If it already exists, its
+    links are yielded first; the pages are requested again from the
+    start, but only links missing from the checkpoint are yielded.
+    """
+    known = load_checkpoint(checkpoint_file)
+    if known:
+        print(f"Resuming from {checkpoint_file} with {len(known)} links")
+        yield from sorted(known)
+    seen = set()  # links found by this run, for the stop condition
+    page = 1
+    checkpoint = open(checkpoint_file, "a") if checkpoint_file else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while page <= max_pages:
+                batch = range(page, min(page + workers, max_pages + 1))
+                pages = pool.map(lambda p: fetch_page(session, page_url(url, p, page_param), rate_controller),
+                                 batch)
+                exhausted = False
+                for number, html in zip(batch, pages):
+                    page_links = parse_icon_links(html)
+                    if not page_links - seen:
+                        exhausted = True
+                    seen |= page_links
+                    new_links = sorted(page_links - known)
+                    known.update(new_links)
+                    if checkpoint and new_links:
+                        checkpoint.write("".join(link + "\n" for link in new_links))
+                        checkpoint.flush()
+                    print(f"Page {number}: {len(known)} links collected")
+                    yield from new_links
+                if exhausted:
+                    print("*** Reached last page ***")
+                    break
+                page += workers
+    finally:
+        if checkpoint:
+            checkpoint.close()
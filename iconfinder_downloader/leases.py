@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+from .metrics import metrics
+
+# ============================================================
+# WORK LEASES
+# ============================================================
+# Lets several workers (processes or machines sharing icon_dir) split
+# one family without requesting the same icon twice. Claiming an icon
+# creates <icon_dir>/.leases/<icon_id>.lease with O_EXCL, which is
+# atomic on local and network filesystems. Held leases are touched
+# periodically; a lease nobody touched for `ttl` seconds belongs to a
+# dead worker and is taken over.
+LEASE_DIR_NAME = ".leases"
+DEFAULT_LEASE_TTL = 600.0
+
+
+def default_owner():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseTable:
+    def __init__(self, icon_dir, owner=None, ttl=DEFAULT_LEASE_TTL):
+        self.root = os.path.join(icon_dir, LEASE_DIR_NAME)
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.held = {}  # key -> token written into our lease file
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.lease")
+
+    def claim(self, key):
+        """True if this worker now holds `key`, False if a live worker does."""
+        path = self.path(key)
+        for _ in range(3):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._take_over_expired(key, path):
+                    return False
+                continue
+            token = uuid.uuid4().hex
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"owner": self.owner, "token": token, "claimed_at": time.time()}, fh)
+            with self._lock:
+                self.held[key] = token
+            self._start_heartbeat()
+            return True
+        return False
+
+    def _take_over_expired(self, key, path):
+        """Remove the lease at `path` if it expired. True if it is gone now."""
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return True
+        if age < self.ttl:
+            return False
+        expired_token = self.read_lease(path).get("token")
+        # Move the file aside before deciding. Another worker may have taken
+        # the lease over and claimed it again between our stat and the
+        # rename, so what was moved is checked again and put back if it
+        # isn't the lease that expired.
+        stale = f"{path}.stale.{self.owner}"
+        try:
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return True
+        lease = self.read_lease(stale)
+        age = time.time() - os.stat(stale).st_mtime
+        if age < self.ttl or lease.get("token") != expired_token:
+            self._put_back(stale, path)
+            return False
+        os.remove(stale)
+        previous = lease.get("owner")
+        print(f"♻️  Taking over lease of {key} from {previous} (idle for {age:.0f}s)")
+        metrics.count("leases_expired")
+        metrics.event("lease_expired", key=key, owner=previous, age=round(age, 1))
+        return True
+
+    @staticmethod
+    def _put_back(moved, path):
+        """Restore a lease file moved aside by mistake, unless `path` was claimed again meanwhile."""
+        try:
+            os.link(moved, path)  # fails instead of replacing a newer lease
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hardlinks on this filesystem
+            if not os.path.exists(path):
+                os.rename(moved, path)
+                return
+        os.remove(moved)
+
+    @staticmethod
+    def read_lease(path):
+        try:
+            with open(path, "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def lost(self, key, token):
+        """True if the lease file of `key` now belongs to another worker. A
+        missing file isn't: another worker may be checking it (see above)."""
+        lease = self.read_lease(self.path(key))
+        return bool(lease) and lease.get("token") != token
+
+    def release(self, key):
+        with self._lock:
+            token = self.held.pop(key, None)
+        if token is None:
+            return
+        # Move the file aside first, so a lease another worker took over
+        # meanwhile is put back instead of deleted
+        path = self.path(key)
+        released = f"{path}.release.{self.owner}"
+        try:
+            os.rename(path, released)
+        except FileNotFoundError:
+            return
+        if self.read_lease(released).get("token") == token:
+            os.remove(released)
+        else:
+            self._put_back(released, path)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._renew_loop, daemon=True)
+        self._heartbeat.start()
+
+    def _renew_loop(self):
+        # Renew well within the TTL so slow downloads keep their leases
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self.held.items())
+            for key, token in held:
+                if self.lost(key, token):
+                    # Taken over after we failed to renew in time
+                    print(f"⚠️ Lost the lease of {key} to another worker")
+                    with self._lock:
+                        self.held.pop(key, None)
+                    continue
+                try:
+                    os.utime(self.path(key))
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            keys = list(self.held)
+        for key in keys:
+            self.release(key)
+
+
+def lease_counts(icon_dir, ttl=DEFAULT_LEASE_TTL):
+    """(live, expired) lease files of a family, for stats."""
+    live = expired = 0
+    now = time.time()
+    try:
+        entries = os.scandir(os.path.join(icon_dir, LEASE_DIR_NAME))
+    except FileNotFoundError:
+        return 0, 0
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(".lease"):
+                continue
+            if now - entry.stat().st_mtime < ttl:
+                live += 1
+            else:
+                expired += 1
+    return live, expired
@@ -0,0 +1,252 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ============================================================
+# DOWNLOAD MANIFEST
+# ============================================================
+# One SQLite database per family remembers what happened to every icon,
+# so a restart can skip finished and premium icons without decoding them.
+MANIFEST_NAME = ".manifest.sqlite"
+
+STATUS_OK = "ok"
+STATUS_PREMIUM = "premium"
+STATUS_FAILED = "failed"
+STATUS_UNPARSEABLE = "unparseable"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS icons (
+    icon_id    TEXT PRIMARY KEY,  -- Iconfinder id, or the raw link when unparseable
+    link       TEXT NOT NULL,
+    base_name  TEXT,
+    icon_type  TEXT,
+    status     TEXT NOT NULL,
+    svg_size   INTEGER,
+    svg_mtime  INTEGER,
+    svg_hash   TEXT,
+    png_size   INTEGER,
+    png_mtime  INTEGER,
+    png_hash   TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+# HTTP validators of the response each file was stored from, for --refresh
+VALIDATORS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    icon_id        TEXT NOT NULL,
+    kind           TEXT NOT NULL,  -- "svg" or "png"
+    etag           TEXT,
+    last_modified  TEXT,
+    content_length INTEGER,
+    updated_at     REAL NOT NULL,
+    PRIMARY KEY (icon_id, kind)
+)
+"""
+
+# Files rewritten by the optimizer: the checksum and size of the file as
+# downloaded, and the fingerprint of the optimized file
+OPTIMIZED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS optimized (
+    icon_id         TEXT NOT NULL,
+    kind            TEXT NOT NULL,  -- "svg" or "png"
+    original_hash   TEXT NOT NULL,
+    original_size   INTEGER NOT NULL,
+    optimized_size  INTEGER NOT NULL,
+    optimized_mtime INTEGER NOT NULL,
+    updated_at      REAL NOT NULL,
+    PRIMARY KEY (icon_id, kind)
+)
+"""
+
+
+def file_sha256(path, chunk_size=1 << 16):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_fingerprint(path, digest=None):
+    """(size, mtime_ns, sha256) of a file; `digest` skips re-reading it."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns, digest or file_sha256(path)
+
+
+class Manifest:
+    def __init__(self, path, shared=False, readonly=False):
+        """`shared`: other workers, possibly on other machines, use the same
+        file. WAL needs shared memory and breaks on network filesystems, so
+        a shared manifest uses a rollback journal and waits for locks.
+        WAL is only chosen for a new file: a manifest a shared run left in
+        rollback journal mode stays in it.
+
+        `readonly`: open an existing manifest for queries only, without
+        touching its journal mode or schema (stats)."""
+        self.path = path
+        self._lock = threading.Lock()
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=60, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            return
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._db = sqlite3.connect(path, timeout=60 if shared else 5, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if shared:
+            self._db.execute("PRAGMA journal_mode=DELETE")
+        elif is_new:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db.execute(VALIDATORS_SCHEMA)
+        self._db.execute(OPTIMIZED_SCHEMA)
+        self._db.commit()
+
+    @classmethod
+    def for_family(cls, icon_dir, shared=False):
+        os.makedirs(icon_dir, exist_ok=True)
+        return cls(os.path.join(icon_dir, MANIFEST_NAME), shared)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get(self, icon_id):
+        with self._lock:
+            return self._db.execute(
+                "SELECT * FROM icons WHERE icon_id = ?", (icon_id,)
+            ).fetchone()
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM icons GROUP BY status")
+            return dict(rows.fetchall())
+
+    def verified_fingerprints(self):
+        """{icon_id: ((svg_size, svg_mtime), (png_size, png_mtime))} for every OK icon."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT icon_id, svg_size, svg_mtime, png_size, png_mtime FROM icons WHERE status = ?",
+                (STATUS_OK,),
+            ).fetchall()
+        return {row[0]: ((row[1], row[2]), (row[3], row[4])) for row in rows}
+
+    def totals(self):
+        """(icons, svg bytes, png bytes, last update) over every OK icon."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(svg_size), 0), COALESCE(SUM(png_size), 0), MAX(updated_at) "
+                "FROM icons WHERE status = ?", (STATUS_OK,)
+            ).fetchone()
+        return tuple(row)
+
+    def links_with_status(self, status):
+        with self._lock:
+            rows = self._db.execute("SELECT link FROM icons WHERE status = ? ORDER BY link", (status,))
+            return [row[0] for row in rows]
+
+    def ok_icons(self):
+        """(icon_id, base_name, icon_type) of every OK icon."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT icon_id, base_name, icon_type FROM icons WHERE status = ?", (STATUS_OK,)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def catalog_rows(self):
+        """Every OK icon with its file sizes and hashes, by name and style."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT icon_id, base_name, icon_type, svg_size, svg_hash, png_size, png_hash "
+                "FROM icons WHERE status = ? ORDER BY base_name, icon_type", (STATUS_OK,)
+            ).fetchall()
+
+    def premium_ids(self):
+        with self._lock:
+            rows = self._db.execute("SELECT icon_id FROM icons WHERE status = ?", (STATUS_PREMIUM,))
+            return {row[0] for row in rows}
+
+    def is_verified(self, icon_id, svg_path, png_path):
+        """True if the icon was stored OK and neither file changed since."""
+        row = self.get(icon_id)
+        if row is None or row["status"] != STATUS_OK:
+            return False
+        for prefix, path in (("svg", svg_path), ("png", png_path)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if st.st_size != row[f"{prefix}_size"] or st.st_mtime_ns != row[f"{prefix}_mtime"]:
+                return False
+        return True
+
+    def _upsert(self, icon_id, link, status, base_name=None, icon_type=None,
+                svg=(None, None, None), png=(None, None, None)):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO icons VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (icon_id, link, base_name, icon_type, status, *svg, *png, time.time()),
+            )
+            self._db.commit()
+
+    def record_ok(self, icon_id, link, base_name, icon_type, svg_path, png_path,
+                  svg_hash=None, png_hash=None):
+        self._upsert(icon_id, link, STATUS_OK, base_name, icon_type,
+                     file_fingerprint(svg_path, svg_hash), file_fingerprint(png_path, png_hash))
+
+    def record_premium(self, icon_id, link, base_name, icon_type):
+        self._upsert(icon_id, link, STATUS_PREMIUM, base_name, icon_type)
+
+    def record_failed(self, icon_id, link, base_name, icon_type):
+        self._upsert(icon_id, link, STATUS_FAILED, base_name, icon_type)
+
+    def record_unparseable(self, link):
+        self._upsert(link, link, STATUS_UNPARSEABLE)
+
+    def get_validators(self, icon_id):
+        """{kind: row} with the stored ETag / Last-Modified / Content-Length."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM validators WHERE icon_id = ?", (icon_id,)).fetchall()
+        return {row["kind"]: row for row in rows}
+
+    def record_validators(self, icon_id, kind, etag, last_modified, content_length):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?)",
+                (icon_id, kind, etag, last_modified,
+                 int(content_length) if content_length else None, time.time()),
+            )
+            self._db.commit()
+
+    def optimized_fingerprints(self):
+        """{(icon_id, kind): (size, mtime_ns)} of every optimized file."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT icon_id, kind, optimized_size, optimized_mtime FROM optimized"
+            ).fetchall()
+        return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+    def get_optimized(self, icon_id):
+        """{kind: row} with the original checksum and size of optimized files."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM optimized WHERE icon_id = ?", (icon_id,)).fetchall()
+        return {row["kind"]: row for row in rows}
+
+    def record_optimized(self, icon_id, kind, path, original_hash, original_size, digest):
+        """Remember the original of `path` and move the icon's fingerprint to the new file."""
+        if kind not in ("svg", "png"):
+            raise ValueError(f"unknown file kind {kind!r}")
+        st = os.stat(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO optimized VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (icon_id, kind, original_hash, original_size, st.st_size, st.st_mtime_ns, time.time()),
+            )
+            self._db.execute(
+                f"UPDATE icons SET {kind}_size = ?, {kind}_mtime = ?, {kind}_hash = ? WHERE icon_id = ?",
+                (st.st_size, st.st_mtime_ns, digest, icon_id),
+            )
+            self._db.commit()
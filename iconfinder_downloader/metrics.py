@@ -0,0 +1,165 @@
+import os
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# ============================================================
+# METRICS AND EVENT LOG
+# ============================================================
+# One process-wide collector. Counters, a request latency histogram and
+# the time spent per phase are kept in memory; events are appended to an
+# optional JSONL log and the totals can be written as a Prometheus text
+# snapshot.
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+PHASES = ("sleeping", "transferring", "validating", "scraping")
+PROGRESS_INTERVAL = 10.0
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {}
+        self.status_counts = {}
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.bytes = 0
+        self._log = None
+        self._last_progress = self.started
+        self.snapshot_path = None  # Prometheus snapshot refreshed with the progress line
+
+    def open_log(self, path):
+        self._log = open(path, "a", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+
+    def event(self, kind, **fields):
+        if self._log is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": kind, **fields})
+        with self._lock:
+            if self._log:
+                self._log.write(line + "\n")
+                self._log.flush()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.phase_seconds[phase] += seconds
+
+    @contextmanager
+    def timed(self, phase):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.monotonic() - start)
+
+    def observe_request(self, url, status, latency):
+        """One HTTP response: `latency` is the time until its headers arrived."""
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.latency_sum += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+            self.phase_seconds["transferring"] += latency
+        self.event("request", url=url, status=status, latency=round(latency, 4))
+
+    def observe_body(self, nbytes, seconds):
+        with self._lock:
+            self.bytes += nbytes
+            self.phase_seconds["transferring"] += seconds
+
+    def requests_by_class(self):
+        """Totals for the statuses we care about: 200, 403, 429 and 5xx."""
+        with self._lock:
+            counts = dict(self.status_counts)
+        return {
+            "200": counts.get(200, 0),
+            "403": counts.get(403, 0),
+            "429": counts.get(429, 0),
+            "5xx": sum(n for status, n in counts.items() if 500 <= status < 600),
+            "total": sum(counts.values()),
+        }
+
+    def bytes_per_second(self):
+        transferring = self.phase_seconds["transferring"]
+        return self.bytes / transferring if transferring else 0.0
+
+    def maybe_print_progress(self, done, total):
+        """Print a throughput/ETA line at most every PROGRESS_INTERVAL seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed else 0.0
+        eta = ""
+        if isinstance(total, int) and rate:
+            eta = f", ETA {format_duration((total - done) / rate)}"
+        print(f"📊 {done}/{total} icons, {rate:.2f} icons/s, "
+              f"{self.bytes_per_second() / 1024:.0f} KiB/s{eta}")
+        if self.snapshot_path:
+            self.write_prometheus(self.snapshot_path)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        phases = ", ".join(f"{phase} {format_duration(s)}" for phase, s in self.phase_seconds.items() if s)
+        requests = self.requests_by_class()
+        return (f"{requests['total']} requests (429: {requests['429']}, 403: {requests['403']}, "
+                f"5xx: {requests['5xx']}), {self.bytes / 1024 / 1024:.1f} MiB, "
+                f"{self.counters.get('session_resets', 0)} session resets, "
+                f"{format_duration(elapsed)} total ({phases})")
+
+    def prometheus_text(self):
+        lines = [
+            "# TYPE iconfinder_requests_total counter",
+        ]
+        with self._lock:
+            for status, n in sorted(self.status_counts.items()):
+                lines.append(f'iconfinder_requests_total{{status="{status}"}} {n}')
+            lines.append("# TYPE iconfinder_request_latency_seconds histogram")
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, self.latency_buckets):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else bound
+                lines.append(f'iconfinder_request_latency_seconds_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f"iconfinder_request_latency_seconds_sum {self.latency_sum:.4f}")
+            lines.append(f"iconfinder_request_latency_seconds_count {cumulative}")
+            lines.append("# TYPE iconfinder_bytes_total counter")
+            lines.append(f"iconfinder_bytes_total {self.bytes}")
+            lines.append("# TYPE iconfinder_phase_seconds_total counter")
+            for phase, seconds in self.phase_seconds.items():
+                lines.append(f'iconfinder_phase_seconds_total{{phase="{phase}"}} {seconds:.3f}')
+            lines.append("# TYPE iconfinder_events_total counter")
+            for name, n in sorted(self.counters.items()):
+                lines.append(f'iconfinder_events_total{{name="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+
+metrics = Metrics()
@@ -0,0 +1,249 @@
+import os
+import re
+import zlib
+import struct
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree as ET
+
+from .manifest import Manifest
+from .blobstore import BlobStore
+from .planner import in_shard
+from .verify import PNG_SIGNATURE, png_structure_error, svg_error
+
+# ============================================================
+# SVG MINIFICATION AND PNG RECOMPRESSION
+# ============================================================
+# Shrinks the stored files after the download, in a process pool.
+# SVGs lose comments, metadata and editor attributes and have their
+# coordinates rounded; PNGs keep their exact pixel data but are deflated
+# again at the highest zlib level. Driven by the "optimize" configuration
+# key. The manifest keeps the original checksum and size of every file
+# and the fingerprint of the optimized one, so reruns skip it. With
+# "dedup", optimized files go into the blob store like downloads do.
+DEFAULT_SVG_PRECISION = 3
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+# Elements that only carry editor or authoring information
+DROPPED_TAGS = {f"{{{SVG_NS}}}metadata"}
+# Attributes whose numbers are geometry and can be rounded
+NUMERIC_ATTRIBUTES = {"points", "transform", "x", "y", "x1", "y1", "x2", "y2", "cx", "cy",
+                      "r", "rx", "ry", "width", "height", "stroke-width", "offset"}
+PATH_COMMANDS = set("MmZzLlHhVvCcSsQqTtAa")
+NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+# Ancillary PNG chunks with text or timestamps only
+DROPPED_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+
+def format_number(value, precision):
+    text = f"{round(float(value), precision):.{precision}f}".rstrip("0").rstrip(".")
+    if text == "-0":
+        return "0"
+    return text
+
+
+def _join(tokens):
+    """Numbers separated by a space unless the sign already separates them."""
+    out = []
+    for token in tokens:
+        if out and token[0] not in "-+" and not out[-1].isalpha() and not token.isalpha():
+            out.append(" ")
+        out.append(token)
+    return "".join(out)
+
+
+def round_numbers(value, precision):
+    """`value` (a transform, points, a length) with every number rounded."""
+    out = []
+    last = 0
+    for m in NUMBER_RE.finditer(value):
+        separator = value[last:m.start()]
+        number = format_number(m.group(), precision)
+        # "1.9999.5" is two numbers; rounded they need a separator again
+        if not separator and out and (out[-1][-1:].isdigit() or out[-1][-1:] == "."):
+            separator = " "
+        out.append(separator + number)
+        last = m.end()
+    out.append(value[last:])
+    return "".join(out)
+
+
+def round_path(d, precision):
+    """Path data with every coordinate rounded. The two flags of an arc
+    may be written without separators ("a1 1 0 011 1"), so the commands
+    are tokenized instead of matching numbers alone."""
+    tokens = []
+    command = None
+    arg = 0
+    pos = 0
+    while pos < len(d):
+        ch = d[pos]
+        if ch in PATH_COMMANDS:
+            command, arg = ch, 0
+            tokens.append(ch)
+            pos += 1
+        elif ch in " ,\t\r\n":
+            pos += 1
+        elif command in ("A", "a") and arg % 7 in (3, 4):
+            if ch not in "01":
+                raise ValueError(f"invalid arc flag {ch!r} in path data")
+            tokens.append(ch)
+            arg += 1
+            pos += 1
+        else:
+            m = NUMBER_RE.match(d, pos)
+            if not m:
+                raise ValueError(f"unexpected {ch!r} in path data")
+            tokens.append(format_number(m.group(), precision))
+            arg += 1
+            pos = m.end()
+    return _join(tokens)
+
+
+def _is_foreign(name):
+    """True for names in a namespace other than SVG and XLink (Inkscape, Sketch, ...)."""
+    return name.startswith("{") and not name.startswith((f"{{{SVG_NS}}}", f"{{{XLINK_NS}}}"))
+
+
+def minify_svg(data, precision=DEFAULT_SVG_PRECISION):
+    """Minified SVG bytes. The parser already drops comments and processing
+    instructions; metadata, foreign elements and attributes and
+    whitespace-only text go too."""
+    root = ET.fromstring(data)
+    for parent in root.iter():
+        for child in list(parent):
+            if child.tag in DROPPED_TAGS or _is_foreign(child.tag):
+                parent.remove(child)
+        for name in [n for n in parent.attrib if _is_foreign(n)]:
+            del parent.attrib[name]
+        for name in NUMERIC_ATTRIBUTES & parent.attrib.keys():
+            parent.attrib[name] = round_numbers(parent.attrib[name], precision)
+        if "d" in parent.attrib:
+            parent.attrib["d"] = round_path(parent.attrib["d"], precision)
+        if parent.text is not None and not parent.text.strip():
+            parent.text = None
+        if parent.tail is not None and not parent.tail.strip():
+            parent.tail = None
+    return ET.tostring(root, encoding="utf-8", xml_declaration=False)
+
+
+def recompress_png(data):
+    """The same PNG with its image data deflated at level 9 into one IDAT
+    chunk and the text chunks left out. Pixels are not decoded."""
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("missing PNG signature")
+    chunks = []
+    idat = []
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IDAT":
+            if not idat:
+                chunks.append((b"IDAT", None))  # placeholder, keeps the chunk order
+            idat.append(body)
+        elif kind not in DROPPED_CHUNKS:
+            chunks.append((kind, body))
+        if kind == b"IEND":
+            break
+
+    compressor = zlib.compressobj(level=9, memLevel=9)
+    packed = compressor.compress(zlib.decompress(b"".join(idat))) + compressor.flush()
+    out = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        body = packed if body is None else body
+        out.append(struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body)))
+    return b"".join(out)
+
+
+def optimize_file(job):
+    """Process pool worker. Returns (job, original sha256, original size, new sha256, error)."""
+    icon_id, kind, path, precision, store_dir = job
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        original = hashlib.sha256(data).hexdigest()
+        optimized = minify_svg(data, precision) if kind == "svg" else recompress_png(data)
+        if len(optimized) >= len(data):
+            return job, original, len(data), original, None
+
+        tmp_path = f"{path}.{os.getpid()}.part"
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(optimized)
+            error = svg_error(tmp_path) if kind == "svg" else png_structure_error(tmp_path)
+            if error:
+                return job, original, len(data), None, f"optimized file is invalid: {error}"
+            digest = hashlib.sha256(optimized).hexdigest()
+            if store_dir:
+                # Replacing the file would only break its link to the blob
+                store = BlobStore(store_dir)
+                store.materialize(store.put(tmp_path, digest, f".{kind}"), path)
+                store.discard_unused(original, f".{kind}")
+            else:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return job, original, len(data), digest, None
+    except Exception as e:
+        return job, None, None, None, str(e)
+
+
+def find_jobs(manifest, icon_dir, precision, shard=None, dedup=False):
+    """(icon_id, kind, path, precision, store dir) for every stored file not optimized yet."""
+    done = manifest.optimized_fingerprints()
+    for icon_id, base_name, icon_type in manifest.ok_icons():
+        if not in_shard(icon_id, shard):
+            continue
+        for kind in ("svg", "png"):
+            path = os.path.join(icon_dir, base_name, f"{icon_type}.{kind}")
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if done.get((icon_id, kind)) != (st.st_size, st.st_mtime_ns):
+                yield icon_id, kind, path, precision, icon_dir if dedup else None
+
+
+def optimize_family(icon_dir, precision=DEFAULT_SVG_PRECISION, workers=None, shard=None, shared=False,
+                    dedup=False):
+    """Optimize every new or re-downloaded file of a family. Returns (files, bytes saved)."""
+    manifest = Manifest.for_family(icon_dir, shared=shared)
+    try:
+        jobs = list(find_jobs(manifest, icon_dir, precision, shard, dedup))
+        print(f"🗜️  Optimizing {len(jobs)} files in {icon_dir}")
+        if not jobs:
+            return 0, 0
+
+        optimized = saved = failed = 0
+        # spawn: this may run after the multi-threaded downloader
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for job, original, size, digest, error in pool.map(optimize_file, jobs, chunksize=32):
+                icon_id, kind, path = job[:3]
+                if error:
+                    failed += 1
+                    print(f"    ❌ {path}: {error}")
+                    continue
+                manifest.record_optimized(icon_id, kind, path, original, size, digest)
+                new_size = os.path.getsize(path)
+                if new_size < size:
+                    optimized += 1
+                    saved += size - new_size
+        print(f"🗜️  Optimized {optimized} files, {saved / 1024 / 1024:.1f} MiB saved, {failed} failed")
+        return optimized, saved
+    finally:
+        manifest.close()
+
+
+def optimize_from_config(config, workers=None, shard=None, shared=False):
+    if config.get("optimize"):
+        optimize_family(config["icon_dir"], config.get("svg_precision", DEFAULT_SVG_PRECISION),
+                        workers, shard, shared, dedup=bool(config.get("dedup")))
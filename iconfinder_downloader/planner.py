@@ -0,0 +1,124 @@
+import os
+
+# ============================================================
+# DOWNLOAD PLANNER
+# ============================================================
+# Parses every link once and diffs the family against a single scan of
+# icon_dir, so only the icons that are actually missing reach the
+# downloader and the summary is known before any request goes out.
+
+
+def parse_icon_link(link, icon_re, remove_prefix):
+    """(icon_id, base_name, icon_type) for a link, or None if it doesn't match."""
+    m = icon_re.search(link)
+    if not m:
+        return None
+    icon_id = m.group(1)
+    base_name = m.group(2).lower().rstrip("_")
+    if base_name.startswith(remove_prefix):
+        base_name = base_name.replace(remove_prefix, "", 1)
+    icon_type = m.group(3).lower() if m.group(3) else "normal"
+    return icon_id, base_name, icon_type
+
+
+def in_shard(icon_id, shard):
+    """True if `icon_id` belongs to `shard`, a 1-based (index, count) pair."""
+    if shard is None:
+        return True
+    index, count = shard
+    return int(icon_id) % count == index - 1
+
+
+def scan_icon_dir(icon_dir):
+    """{"<base_name>/<file>": (size, mtime_ns)} for every file under icon_dir."""
+    found = {}
+    try:
+        folders = os.scandir(icon_dir)
+    except FileNotFoundError:
+        return found
+    with folders:
+        for folder in folders:
+            if not folder.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(folder.path) as files:
+                for entry in files:
+                    if entry.is_file():
+                        st = entry.stat()
+                        found[f"{folder.name}/{entry.name}"] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class Plan:
+    def __init__(self):
+        self.work = []          # links that still need the downloader
+        self.done = 0           # verified in the manifest and unchanged on disk
+        self.to_check = 0       # done, but queued to be revalidated (--refresh)
+        self.premium = 0        # known premium, not requested again
+        self.other_shards = 0   # left to the workers of the other shards (--shard)
+        self.unparseable = []   # links the icon regex doesn't match
+        self.collisions = []    # (target, kept link, dropped link)
+
+    def summary(self):
+        refresh = f" ({self.to_check:,} of them to revalidate)" if self.to_check else ""
+        return (f"{self.done:,} done{refresh}, {len(self.work) - self.to_check:,} to fetch, "
+                f"{self.premium:,} premium, {len(self.unparseable):,} unparseable, "
+                f"{len(self.collisions):,} colliding"
+                + (f", {self.other_shards:,} in other shards" if self.other_shards else ""))
+
+
+def plan_downloads(links, icon_dir, icon_re, remove_prefix, manifest=None, refresh=False, shard=None):
+    """Split `links` into finished icons and the work list for the downloader.
+
+    An icon only counts as done if both of its files have the size and
+    mtime recorded when the manifest verified them. Files that exist but
+    were never verified stay in the work list, where download_icon
+    validates them before skipping. With `refresh`, done icons stay in
+    the work list too, so download_icon can revalidate them upstream.
+    With `shard`, only the icons of that shard are kept; collisions are
+    still detected across every link, so two shards never share a file.
+    """
+    plan = Plan()
+    files = scan_icon_dir(icon_dir)
+    verified = manifest.verified_fingerprints() if manifest else {}
+    premium = manifest.premium_ids() if manifest else set()
+
+    targets = {}
+    for link in dict.fromkeys(links):
+        parsed = parse_icon_link(link, icon_re, remove_prefix)
+        if parsed is None:
+            plan.unparseable.append(link)
+            continue
+        icon_id, base_name, icon_type = parsed
+
+        target = f"{base_name}/{icon_type}"
+        if target in targets:
+            plan.collisions.append((target, targets[target], link))
+            continue
+        targets[target] = link
+
+        if not in_shard(icon_id, shard):
+            plan.other_shards += 1
+            continue
+        if icon_id in premium:
+            plan.premium += 1
+            continue
+        fingerprint = verified.get(icon_id)
+        if fingerprint and fingerprint == (files.get(f"{target}.svg"), files.get(f"{target}.png")):
+            plan.done += 1
+            if not refresh:
+                continue
+            plan.to_check += 1
+        plan.work.append(link)
+
+    if manifest:
+        for link in plan.unparseable:
+            manifest.record_unparseable(link)
+    return plan
+
+
+def report_plan(plan):
+    for link in plan.unparseable:
+        print(f"⚠️  Could not parse link: {link}")
+    for target, kept, dropped in plan.collisions:
+        print(f"⚠️  {target} is claimed by two links, keeping {kept}, dropping {dropped}")
+    print(f"🧭 Plan: {plan.summary()}")
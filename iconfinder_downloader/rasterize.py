@@ -0,0 +1,82 @@
+import os
+import hashlib
+import importlib.util
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .verify import png_structure_error
+
+# ============================================================
+# LOCAL SVG -> PNG RENDERING
+# ============================================================
+# With "png_source": "render" only the SVG is requested from Iconfinder
+# and the 1024px PNG is rendered here, in a process pool. If rendering
+# fails the PNG is downloaded as before.
+PNG_SIZE = 1024
+
+render_workers = None  # None = one process per CPU
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def is_available():
+    # Optional: pip install cairosvg; only imported by the render workers
+    return importlib.util.find_spec("cairosvg") is not None
+
+
+def render_svg(svg_path, png_path, size=PNG_SIZE):
+    """Process pool worker: render `svg_path` into a temp file next to `png_path`.
+
+    Returns (temp path, SHA-256) of a validated PNG; raises on failure.
+    """
+    import cairosvg
+
+    data = cairosvg.svg2png(url=svg_path, output_width=size, output_height=size)
+    folder, name = os.path.split(png_path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{name}.", suffix=".part")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    error = png_structure_error(tmp_path)
+    if error:
+        os.remove(tmp_path)
+        raise ValueError(f"rendered PNG is invalid: {error}")
+    return tmp_path, hashlib.sha256(data).hexdigest()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the downloader is multi-threaded, forking it is not safe
+            _pool = ProcessPoolExecutor(max_workers=render_workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def render_to_file(svg_path, png_path, size=PNG_SIZE, store=None):
+    """Render `png_path` from `svg_path` in the pool and move it into place.
+
+    Returns the SHA-256 of the PNG, or None if it could not be rendered.
+    """
+    if not is_available():
+        return None
+    try:
+        tmp_path, digest = get_pool().submit(render_svg, svg_path, png_path, size).result()
+    except Exception as e:
+        print(f"⚠️ Could not render {svg_path}: {e}")
+        return None
+    if store:
+        store.materialize(store.put(tmp_path, digest, ".png"), png_path)
+    else:
+        os.replace(tmp_path, png_path)
+    return digest
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
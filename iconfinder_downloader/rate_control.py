@@ -0,0 +1,101 @@
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# ============================================================
+# ADAPTIVE RATE CONTROLLER (AIMD)
+# ============================================================
+DEFAULT_INITIAL_RATE = 1.0    # requests per second at start
+DEFAULT_MIN_RATE = 0.05       # never slower than one request every 20s
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_INCREASE = 0.1        # req/s gained per second of clean traffic
+DEFAULT_DECREASE = 0.5        # rate multiplier applied on a 429
+DEFAULT_BACKOFF = 5.0         # pause when a 429 has no Retry-After header
+LOG_INTERVAL = 30.0
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds, or None if missing/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateController:
+    """Paces requests and learns the rate the server tolerates.
+
+    The rate grows additively while responses are 200 and is cut
+    multiplicatively on every 429. A Retry-After header pauses all
+    callers for the requested time.
+    """
+
+    def __init__(self, initial_rate=DEFAULT_INITIAL_RATE, min_rate=DEFAULT_MIN_RATE,
+                 max_rate=DEFAULT_MAX_RATE, increase=DEFAULT_INCREASE,
+                 decrease=DEFAULT_DECREASE, backoff=DEFAULT_BACKOFF):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._last_log = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            initial_rate=config.get("initial_rate", DEFAULT_INITIAL_RATE),
+            min_rate=config.get("min_rate", DEFAULT_MIN_RATE),
+            max_rate=config.get("max_rate", DEFAULT_MAX_RATE),
+        )
+
+    def acquire(self):
+        """Block until the caller may send its next request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            # +increase req/s for every second's worth of successful requests
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self._maybe_log()
+
+    def on_throttle(self, retry_after=None):
+        """Register a 429. `retry_after` is the raw Retry-After header."""
+        wait = parse_retry_after(retry_after)
+        if wait is None:
+            wait = self.backoff + random.uniform(0.0, self.backoff / 2)
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + wait)
+            # Requests already in flight answer 429 together; cut once per pause
+            if now - self._last_decrease > wait:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            print(f"⚠️ Rate limited, pausing {wait:.0f}s, rate now {self.rate:.2f} req/s")
+        return wait
+
+    def _maybe_log(self):
+        now = time.monotonic()
+        if now - self._last_log >= LOG_INTERVAL:
+            self._last_log = now
+            print(f"📈 Current rate: {self.rate:.2f} req/s")
@@ -0,0 +1,64 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+
+# ============================================================
+# DEFERRED RETRY QUEUE
+# ============================================================
+# An icon whose attempt failed (corrupted body, 429, server error) is
+# not retried on the spot, where it would hold its worker for up to
+# max_retries rounds. It is put back here with a due time instead, and
+# the download engines pick it up again once it is due, between fresh
+# links. Whatever is still waiting when the links run out is drained at
+# the end of the run.
+DEFAULT_RETRY_DELAY = 5.0     # wait before the second attempt
+DEFAULT_MAX_RETRY_DELAY = 300.0
+
+
+def backoff_delay(attempt, base=DEFAULT_RETRY_DELAY, cap=DEFAULT_MAX_RETRY_DELAY):
+    """Seconds to wait after failed attempt number `attempt` (1-based):
+    doubled every attempt up to `cap`, with jitter so icons that failed
+    together don't come back together."""
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(1.0, 1.5)
+
+
+class RetryQueue:
+    """Items ordered by the time they are due again. Thread-safe."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()  # keeps equal due times in push order
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def push(self, item, delay):
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
+
+    def pop_due(self):
+        """Remove and return every item whose due time has passed."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def next_due(self):
+        """Seconds until the next item is due (0 if one already is), or None if empty."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def clear(self):
+        """Remove and return every item, due or not."""
+        with self._lock:
+            items = [item for _, _, item in sorted(self._heap)]
+            self._heap.clear()
+        return items
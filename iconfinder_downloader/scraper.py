@@ -0,0 +1,120 @@
+import os
+import time
+
+# ============================================================
+# SCRAPER
+# ============================================================
+# Returns the hrefs of matching anchors not harvested yet and marks them,
+# so every scroll costs one WebDriver round trip however big the DOM gets
+HARVEST_JS = """
+const hrefs = [];
+for (const el of document.querySelectorAll(arguments[0])) {
+    if (el.dataset.harvested) continue;
+    el.dataset.harvested = "1";
+    const href = el.getAttribute("href");
+    if (href) hrefs.push(href);
+}
+return hrefs;
+"""
+
+PENDING_JS = """
+let pending = 0;
+for (const el of document.querySelectorAll(arguments[0])) {
+    if (!el.dataset.harvested) pending++;
+}
+return pending;
+"""
+
+
+def load_checkpoint(checkpoint_file):
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return set()
+    with open(checkpoint_file, "r") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def iter_icon_links(url, link_css, scroll_pause_time, max_scrolls, headless_mode,
+                    checkpoint_file=None):
+    """Scroll the search page and yield icon links as they are discovered.
+
+    New links are appended to `checkpoint_file` as they are found. If the
+    file already exists, its links are yielded first and the scroll through
+    the part of the page they cover skips the fixed pause.
+    """
+    all_links = load_checkpoint(checkpoint_file)
+    resumed = bool(all_links)
+    if resumed:
+        print(f"Resuming from {checkpoint_file} with {len(all_links)} links")
+        yield from sorted(all_links)
+
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    if headless_mode:
+        options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    checkpoint = open(checkpoint_file, "a") if checkpoint_file else None
+
+    def harvest():
+        """Collects the anchors added since the last call, returns the unknown links."""
+        hrefs = driver.execute_script(HARVEST_JS, link_css)
+        new_links = []
+        for href in hrefs:
+            if href.startswith("/"):
+                href = f"https://www.iconfinder.com{href}"
+            if href not in all_links:
+                all_links.add(href)
+                new_links.append(href)
+        if checkpoint and new_links:
+            checkpoint.write("".join(link + "\n" for link in new_links))
+            checkpoint.flush()
+        return new_links
+
+    try:
+        driver.get(url)
+        print(f"Navigating to {url}...")
+
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, link_css))
+        )
+
+        new_links = harvest()
+        yield from new_links
+        catching_up = resumed and not new_links
+        last_height = driver.execute_script("return document.body.scrollHeight")
+
+        for scroll_count in range(1, max_scrolls + 1):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            if not catching_up:
+                time.sleep(scroll_pause_time)
+
+            try:
+                WebDriverWait(driver, 10).until(
+                    lambda d: d.execute_script(PENDING_JS, link_css) > 0
+                )
+            except Exception:
+                pass
+
+            new_links = harvest()
+            yield from new_links
+            if catching_up and new_links:
+                print("Caught up with the checkpoint, back to normal scrolling")
+                catching_up = False
+
+            print(f"Scroll {scroll_count}: {len(all_links)} links collected")
+
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if new_height == last_height:
+                print("*** Reached end of page ***")
+                break
+            last_height = new_height
+    finally:
+        driver.quit()
+        if checkpoint:
+            checkpoint.close()
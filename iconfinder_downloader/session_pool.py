@@ -0,0 +1,180 @@
+import random
+import threading
+import contextlib
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
+
+# ============================================================
+# HEALTH-SCORED SESSION POOL
+# ============================================================
+# Several sessions, each optionally bound to its own proxy. Every
+# response is scored against the session that fetched it, and only a
+# session whose recent responses are mostly bad is recycled, so one
+# corrupt body no longer drops every pooled keep-alive connection.
+DEFAULT_SESSIONS = 1
+DEFAULT_WINDOW = 20           # recent outcomes a session is scored on
+DEFAULT_MIN_SAMPLES = 4       # outcomes needed before a session can be judged
+DEFAULT_THRESHOLD = 0.75      # sessions scoring below this are recycled
+
+OUTCOME_OK = "ok"
+OUTCOME_CORRUPT = "corrupt"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_ERROR = "error"
+
+# How much each outcome counts against a session. A 429 is mostly about
+# the whole client and is already handled by the rate controller.
+PENALTIES = {OUTCOME_OK: 0.0, OUTCOME_CORRUPT: 1.0, OUTCOME_THROTTLED: 0.5, OUTCOME_ERROR: 1.0}
+
+# Statuses that say nothing bad about the session: a premium icon (403)
+# or a missing page (404) is answered the same on every session
+HEALTHY_STATUSES = {200, 206, 304, 403, 404}
+
+
+def outcome_for_status(status_code):
+    """The outcome a response status counts as. Server errors and
+    unexpected statuses (407 from a proxy, 502 from a dead one) count
+    against the session."""
+    if status_code == 429:
+        return OUTCOME_THROTTLED
+    if status_code in HEALTHY_STATUSES:
+        return OUTCOME_OK
+    return OUTCOME_ERROR
+
+
+def make_session(proxy=None, pool_maxsize=10):
+    """A session with a random UA and (optional) proxy."""
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": f"Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:{random.randint(90,120)}.0) Gecko/20100101 Firefox/{random.randint(90,120)}.0"
+    })
+    # Keep enough pooled connections for every concurrent request
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if proxy:
+        session.proxies = {"http": proxy, "https": proxy}
+    return session
+
+
+class PooledSession:
+    """One session of the pool and its recent outcomes."""
+
+    def __init__(self, index, proxy, pool_maxsize, window):
+        self.index = index
+        self.proxy = proxy
+        self.session = make_session(proxy, pool_maxsize)
+        self.outcomes = deque(maxlen=window)
+        self.in_flight = 0
+        self.retired = False
+
+    def health(self):
+        """1.0 for a session without recent problems, down to 0.0."""
+        if not self.outcomes:
+            return 1.0
+        return 1.0 - sum(PENALTIES[o] for o in self.outcomes) / len(self.outcomes)
+
+
+class SessionPool:
+    """Hands out the healthiest, least busy session for each request.
+
+    `size` sessions are created up front; with `proxies`, session i uses
+    proxy i (round-robin) and a recycled session moves on to the next
+    proxy. A session that is recycled while requests are still running
+    on it is closed once the last of them finishes.
+    """
+
+    def __init__(self, size=DEFAULT_SESSIONS, proxies=(), pool_maxsize=10, window=DEFAULT_WINDOW,
+                 min_samples=DEFAULT_MIN_SAMPLES, threshold=DEFAULT_THRESHOLD):
+        self.proxies = list(proxies)
+        self.pool_maxsize = pool_maxsize
+        self.window = window
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._next_proxy = 0
+        self.members = [self._new_member(i) for i in range(max(1, int(size)))]
+
+    @classmethod
+    def from_config(cls, config, proxies=(), pool_maxsize=10, size=None):
+        return cls(
+            size=size or config.get("sessions", DEFAULT_SESSIONS),
+            proxies=proxies,
+            pool_maxsize=pool_maxsize,
+            threshold=config.get("session_health_threshold", DEFAULT_THRESHOLD),
+        )
+
+    def _new_member(self, index):
+        proxy = None
+        if self.proxies:
+            proxy = self.proxies[self._next_proxy % len(self.proxies)]
+            self._next_proxy += 1
+            print(f"🌐 Session {index} using proxy: {proxy}")
+        return PooledSession(index, proxy, self.pool_maxsize, self.window)
+
+    def _pick(self):
+        with self._lock:
+            n = len(self.members)
+            # Healthy first, then least busy; ties rotate through the pool
+            member = min(self.members, key=lambda m: (-round(m.health(), 1), m.in_flight,
+                                                      (m.index - self._cursor) % n))
+            self._cursor = (member.index + 1) % n
+            member.in_flight += 1
+            return member
+
+    def _release(self, member):
+        with self._lock:
+            member.in_flight -= 1
+            close = member.retired and member.in_flight == 0
+        if close:
+            member.session.close()
+
+    @contextlib.contextmanager
+    def lease(self):
+        """Yields a PooledSession for one request (and its body)."""
+        member = self._pick()
+        try:
+            yield member
+        finally:
+            self._release(member)
+
+    def report(self, member, outcome):
+        """Score one response; recycles the session if it has degraded."""
+        with self._lock:
+            if member.retired:
+                return
+            member.outcomes.append(outcome)
+            if len(member.outcomes) < self.min_samples or member.health() >= self.threshold:
+                return
+            health = member.health()
+            member.retired = True
+            replacement = self._new_member(member.index)
+            self.members[member.index] = replacement
+            close = member.in_flight == 0
+        print(f"🔁 Recycling session {member.index} (health {health:.2f})...")
+        metrics.count("session_resets")
+        metrics.event("session_reset", session=member.index, health=round(health, 3),
+                      proxy=replacement.proxy)
+        if close:
+            member.session.close()
+
+    def get(self, url, **kwargs):
+        """`requests.get` through the pool, scored by status; for the scraper."""
+        with self.lease() as member:
+            try:
+                resp = member.session.get(url, **kwargs)
+            except requests.RequestException:
+                self.report(member, OUTCOME_ERROR)
+                raise
+            self.report(member, outcome_for_status(resp.status_code))
+            return resp
+
+    def close(self):
+        with self._lock:
+            members, self.members = self.members, []
+        for member in members:
+            member.session.close()
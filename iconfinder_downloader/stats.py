@@ -0,0 +1,68 @@
+import os
+import time
+
+from .manifest import Manifest, MANIFEST_NAME, STATUS_FAILED
+from .leases import lease_counts
+
+# ============================================================
+# FAMILY STATISTICS
+# ============================================================
+# Reads only the links file and the manifest, so it is instant on a
+# finished tree and needs none of the download dependencies.
+
+
+def count_links(links_file):
+    try:
+        with open(links_file, "r") as f:
+            return sum(1 for line in f if line.strip())
+    except OSError:
+        return None
+
+
+def family_stats(name, config):
+    """A dict describing how far a family got, from its manifest."""
+    stats = {"family": name, "icon_dir": config["icon_dir"],
+             "links": count_links(config["links_file"]), "manifest": None,
+             "leases": lease_counts(config["icon_dir"])}
+    path = os.path.join(config["icon_dir"], MANIFEST_NAME)
+    if not os.path.exists(path):
+        return stats
+    manifest = Manifest(path, readonly=True)
+    try:
+        icons, svg_bytes, png_bytes, updated_at = manifest.totals()
+        stats.update({
+            "manifest": path,
+            "status": manifest.counts(),
+            "svg_bytes": svg_bytes,
+            "png_bytes": png_bytes,
+            "updated_at": updated_at,
+            "failed": manifest.links_with_status(STATUS_FAILED),
+        })
+    finally:
+        manifest.close()
+    return stats
+
+
+def format_stats(stats, show_failed=False):
+    lines = [f"📒 {stats['family']} ({stats['icon_dir']})"]
+    links = stats["links"]
+    lines.append(f"    links file: {links if links is not None else 'not scraped yet'}")
+    if stats["manifest"] is None:
+        lines.append("    no manifest yet, nothing downloaded")
+        return "\n".join(lines)
+
+    status = stats["status"]
+    done = status.get("ok", 0)
+    progress = f" ({done / links:.1%} of the links)" if links else ""
+    lines.append(f"    ok: {done}{progress}, premium: {status.get('premium', 0)}, "
+                 f"failed: {status.get('failed', 0)}, unparseable: {status.get('unparseable', 0)}")
+    lines.append(f"    stored: {stats['svg_bytes'] / 1024 / 1024:.1f} MiB SVG, "
+                 f"{stats['png_bytes'] / 1024 / 1024:.1f} MiB PNG")
+    if stats["updated_at"]:
+        lines.append(f"    last update: {time.strftime('%Y-%m-%d %H:%M', time.localtime(stats['updated_at']))}")
+    live, expired = stats["leases"]
+    if live or expired:
+        lines.append(f"    leases: {live} held by running workers, {expired} expired")
+    if show_failed:
+        lines.extend(f"    ❌ {link}" for link in stats["failed"])
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+import os
+import json
+import zlib
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree as ET
+
+# Results of earlier runs, keyed by path relative to the root directory
+CACHE_NAME = ".cleanup_cache.json"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def png_structure_error(file_path):
+    """Cheap PNG check: walks the chunks, verifying every CRC, up to IEND.
+
+    Returns a description of the problem, or None if the file is sound.
+    """
+    with open(file_path, "rb") as fh:
+        if fh.read(8) != PNG_SIGNATURE:
+            return "missing PNG signature"
+        first = True
+        while True:
+            header = fh.read(8)
+            if len(header) < 8:
+                return "truncated before IEND"
+            length, chunk_type = struct.unpack(">I4s", header)
+            if first and chunk_type != b"IHDR":
+                return "first chunk is not IHDR"
+            first = False
+            data = fh.read(length)
+            crc = fh.read(4)
+            if len(data) < length or len(crc) < 4:
+                return f"truncated inside {chunk_type.decode('latin-1')} chunk"
+            if zlib.crc32(chunk_type + data) != struct.unpack(">I", crc)[0]:
+                return f"CRC mismatch in {chunk_type.decode('latin-1')} chunk"
+            if chunk_type == b"IEND":
+                return None
+
+
+def png_decode_error(file_path):
+    """Deep PNG check: fully decodes the image with Pillow. `file_path`
+    may also be a file object (download.py checks bodies in memory)."""
+    from PIL import Image
+
+    try:
+        # Verify that it is, in fact, an image by reading its header/footer
+        img = Image.open(file_path)
+        img.verify()
+
+        # Re-open and load the image content to catch deeper issues like truncated files
+        # The verify() call closes the file, so we need to re-open it.
+        img = Image.open(file_path)
+        img.load()
+        return None
+    except Exception as e:
+        # Pillow raises more than OSError for broken files (ValueError, SyntaxError, ...)
+        return str(e) or type(e).__name__
+
+
+def svg_error(file_path):
+    """Parses the SVG incrementally and checks that the root tag is <svg>."""
+    try:
+        root_tag = None
+        for event, elem in ET.iterparse(file_path, events=("start", "end")):
+            if root_tag is None:
+                root_tag = elem.tag
+            elif event == "end":
+                elem.clear()  # Only the parse matters, keep memory flat
+        if root_tag is None or 'svg' not in root_tag.lower():
+            return f"Root tag is not <svg> (found: {root_tag})"
+        return None
+    except ET.ParseError as e:
+        # Catch XML parsing errors, which indicate corruption or incomplete file
+        return f"XML error: {e}"
+    except FileNotFoundError:
+        return "file not found"
+
+
+def validate_file(job):
+    """Process pool worker. Returns (file_path, error or None)."""
+    file_path, deep = job[:2]
+    try:
+        if file_path.lower().endswith(".png"):
+            error = png_structure_error(file_path)
+            if error is None and deep:
+                error = png_decode_error(file_path)
+        else:
+            error = svg_error(file_path)
+    except OSError as e:
+        error = str(e)
+    return file_path, error
+
+
+def load_cache(root_dir):
+    try:
+        with open(os.path.join(root_dir, CACHE_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(root_dir, cache):
+    path = os.path.join(root_dir, CACHE_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(cache, f)
+    os.replace(path + ".tmp", path)
+
+
+def delete_faulty_images(root_dir, deep=False, workers=None, use_cache=True):
+    """Walks through the root directory and deletes any faulty images.
+
+    Files are checked in a process pool. By default PNGs only get a
+    structural check (chunk CRCs and IEND); `deep` also decodes them with
+    Pillow. Valid files are cached by size and mtime, so later runs only
+    re-check files that changed.
+    """
+    if not os.path.isdir(root_dir):
+        print(f"Error: Directory '{root_dir}' not found.")
+        return
+
+    total_deleted = 0
+    cache = load_cache(root_dir) if use_cache else {}
+
+    print(f"--- Starting {'deep' if deep else 'quick'} scan of '{root_dir}' for faulty images... ---\n")
+
+    jobs = []
+    stats = {}
+    # Hardlinked files (see blobstore.py) share an inode and are checked once
+    inodes = {}
+    skipped = 0
+    # os.walk traverses the directory tree, yielding (dirpath, dirnames, filenames)
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        # We only care about files in the subdirectories, not the root 'icons' folder itself
+        if dirpath == root_dir:
+            continue
+
+        for filename in filenames:
+            if not filename.lower().endswith((".png", ".svg")):
+                continue
+            file_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(file_path, root_dir)
+            st = os.stat(file_path)
+            stats[file_path] = (rel_path, st.st_size, st.st_mtime_ns)
+            inode = (st.st_dev, st.st_ino)
+            if inode in inodes:
+                inodes[inode].append(file_path)
+                continue
+            inodes[inode] = [file_path]
+
+            cached = cache.get(rel_path)
+            # A deep result also covers a quick scan, but not the other way round
+            if cached and cached[:2] == [st.st_size, st.st_mtime_ns] and (cached[2] or not deep):
+                skipped += 1
+                continue
+            jobs.append((file_path, deep, inode))
+
+    print(f"{len(jobs)} files to check, {skipped} unchanged since the last scan")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (file_path, error), job in zip(pool.map(validate_file, jobs, chunksize=64), jobs):
+                for linked_path in inodes[job[2]]:
+                    rel_path, size, mtime = stats[linked_path]
+                    if error is None:
+                        cache[rel_path] = [size, mtime, deep]
+                        continue
+
+                    print(f"    ❌ {rel_path}: {error}")
+                    cache.pop(rel_path, None)
+                    try:
+                        os.remove(linked_path)
+                        total_deleted += 1
+                        print(f"    ✅ DELETED: {rel_path}")
+                    except OSError as e:
+                        print(f"    ⚠️  Could not delete {linked_path}: {e}")
+    finally:
+        if use_cache:
+            # Forget files that no longer exist
+            present = {rel_path for rel_path, _, _ in stats.values()}
+            save_cache(root_dir, {k: v for k, v in cache.items() if k in present})
+
+    print(f"\n--- Scan complete. Total faulty images deleted: {total_deleted} ---")
+
@@ -0,0 +1,192 @@
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# ============================================================
+# MOCK ICONFINDER SERVER
+# ============================================================
+# A local stand-in for the parts of Iconfinder the tool talks to, so
+# pacing and concurrency can be measured offline (see benchmark.py):
+#   /icons/<id>/download/svg/4096   an SVG
+#   /icons/<id>/download/png/1024   a PNG
+#   /search?page=N                  a result page with PER_PAGE icon links
+#   /__stats                        request counters and the search page layout as JSON
+# Downloads carry an ETag and answer If-None-Match with 304.
+DOWNLOAD_RE = re.compile(r"^/icons/(\d+)/download/(svg/4096|png/1024)$")
+
+SVG_BODY = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 256 256">'
+    '<!-- mock icon {id} --><path d="M128,24A104,104,0,1,0,232,128,104.11,104.11,0,0,0,128,24Z"/></svg>'
+)
+
+SCROLL_JS = """
+<script>
+let page = 1, loading = false;
+window.addEventListener("scroll", async () => {
+  if (loading || window.innerHeight + window.scrollY < document.body.scrollHeight - 10) return;
+  loading = true;
+  const resp = await fetch(`/search?page=${++page}&fragment=1`);
+  document.getElementById("grid").insertAdjacentHTML("beforeend", await resp.text());
+  loading = false;
+});
+</script>
+"""
+
+
+def make_png(size):
+    """A valid, mostly empty RGBA PNG of size x size."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = b"".join(b"\x00" + b"\x00" * (size * 4) for _ in range(size))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 9))
+            + chunk(b"IEND", b""))
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.png = make_png(args.png_size)
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "by_status": {}, "search_requests": 0,
+                      "search": {"pages": args.pages, "per_page": args.per_page, "first_id": args.first_id}}
+
+    def roll(self, probability):
+        with self.lock:
+            return self.random.random() < probability
+
+    def record(self, status):
+        with self.lock:
+            self.stats["requests"] += 1
+            key = str(status)
+            self.stats["by_status"][key] = self.stats["by_status"].get(key, 0) + 1
+
+
+def make_handler(state):
+    args = state.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def send_body(self, status, body, content_type="application/octet-stream", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                with state.lock:
+                    body = json.dumps(state.stats).encode()
+                return self.send_body(200, body, "application/json")
+
+            if args.latency:
+                time.sleep(max(0.0, state.random.gauss(args.latency, args.latency / 4)))
+
+            if url.path == "/search":
+                return self.search(parse_qs(url.query))
+            m = DOWNLOAD_RE.match(url.path)
+            if not m:
+                state.record(404)
+                return self.send_body(404, b"not found", "text/plain")
+            self.download(int(m.group(1)), m.group(2).startswith("svg"))
+
+        def search(self, query):
+            page = int(query.get("page", ["1"])[0])
+            with state.lock:
+                state.stats["search_requests"] += 1
+            links = []
+            if page <= args.pages:
+                first = args.first_id + (page - 1) * args.per_page
+                links = [f'<a data-action="icon-details" href="/icons/{i}/mock_{i}_icon">{i}</a>'
+                         for i in range(first, first + args.per_page)]
+            html = "\n".join(links)
+            if "fragment" not in query:
+                html = f'<html><body><div id="grid">{html}</div>{SCROLL_JS}</body></html>'
+            state.record(200)
+            self.send_body(200, html.encode(), "text/html")
+
+        def download(self, icon_id, is_svg):
+            if state.roll(args.rate_429):
+                state.record(429)
+                return self.send_body(429, b"too many requests", "text/plain",
+                                      {"Retry-After": str(args.retry_after)})
+            if args.premium_every and icon_id % args.premium_every == 0:
+                state.record(403)
+                return self.send_body(403, b"premium", "text/plain")
+
+            if is_svg:
+                body, content_type = SVG_BODY.format(id=icon_id).encode(), "image/svg+xml"
+            else:
+                body, content_type = state.png, "image/png"
+            etag = f'"{zlib.crc32(body):08x}"'
+            if self.headers.get("If-None-Match") == etag:
+                state.record(304)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                return self.end_headers()
+            if state.roll(args.truncate):
+                body = body[:len(body) // 2]
+            elif state.roll(args.corrupt):
+                body = bytes(b ^ 0x5A for b in body)
+            state.record(200)
+            self.send_body(200, body, content_type, {"ETag": etag})
+
+    return Handler
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serve a fake Iconfinder for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean response latency in seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of answering 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After sent with a 429")
+    parser.add_argument("--premium-every", type=int, default=0, help="ids divisible by N answer 403")
+    parser.add_argument("--truncate", type=float, default=0.0, help="probability of a truncated body")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="probability of a garbled body")
+    parser.add_argument("--png-size", type=int, default=1024)
+    parser.add_argument("--pages", type=int, default=100, help="number of search result pages")
+    parser.add_argument("--per-page", type=int, default=60)
+    parser.add_argument("--first-id", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(args)))
+    server.daemon_threads = True
+    print(f"🧪 Mock Iconfinder on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(parse_args(sys.argv[1:]))